@@ -0,0 +1,152 @@
+import math
+import threading
+import numpy as np
+import pandas as pd
+
+# --- DETECÇÃO DE ANOMALIAS NO FATURAMENTO DIÁRIO ---
+# Modelo sazonal simples: cada dia da semana tem a sua própria "régua"
+# (média e variância com peso exponencial). Sábado é comparado com sábados,
+# segunda com segundas... O resíduo (valor - média do dia) vira um z-score.
+# Cada dia novo atualiza só a régua do seu dia da semana: O(1), sem reler o histórico.
+
+ALPHA = 0.2           # Peso das observações novas (quanto maior, mais rápido esquece o passado)
+LIMIAR_Z = 3.0        # |z| acima disso = anomalia
+MIN_OBSERVACOES = 4   # Semanas mínimas de histórico por dia da semana antes de alertar
+DESVIO_MINIMO = 10.0  # R$ - evita z-score gigante quando o dia é sempre igual (ex: domingo = 0)
+
+
+def _z_score(valor, media, variancia):
+    desvio = max(math.sqrt(variancia), DESVIO_MINIMO)
+    return (valor - media) / desvio
+
+
+class DetectorAnomalias:
+    # Detector incremental: chamar atualizar() uma vez por dia fechado, em ordem
+
+    def __init__(self, alpha=ALPHA, limiar=LIMIAR_Z, min_observacoes=MIN_OBSERVACOES):
+        self.alpha = alpha
+        self.limiar = limiar
+        self.min_observacoes = min_observacoes
+
+        # Estado por dia da semana (0 = Segunda ... 6 = Domingo)
+        self.media = [0.0] * 7
+        self.variancia = [0.0] * 7
+        self.contagem = [0] * 7
+
+        self.ultima_data = None
+        self.anomalias = []   # Lista de dicts com os dias marcados
+        self.lock = threading.Lock()  # O detector fica compartilhado entre sessões
+
+    def avaliar(self, data, valor):
+        # Só calcula o z-score (não mexe no estado). Útil para o dia que ainda está em aberto.
+        dia = data.dayofweek
+        if self.contagem[dia] < self.min_observacoes:
+            return None
+        return _z_score(valor, self.media[dia], self.variancia[dia])
+
+    def atualizar(self, data, valor):
+        # Avalia o dia contra a régua atual e depois atualiza a régua (O(1))
+        z = self.avaliar(data, valor)
+        if z is not None and abs(z) > self.limiar:
+            self.anomalias.append({
+                'Data': data,
+                'Faturamento': valor,
+                'Esperado': self.media[data.dayofweek],
+                'Z': z,
+                'Tipo': 'Pico' if z > 0 else 'Queda',
+            })
+
+        dia = data.dayofweek
+        if self.contagem[dia] == 0:
+            self.media[dia] = valor
+            self.variancia[dia] = 0.0
+        else:
+            # Média e variância exponenciais (mesma fórmula do pandas ewm(adjust=False))
+            diferenca = valor - self.media[dia]
+            incremento = self.alpha * diferenca
+            self.media[dia] += incremento
+            self.variancia[dia] = (1 - self.alpha) * (self.variancia[dia] + diferenca * incremento)
+        self.contagem[dia] += 1
+        self.ultima_data = data
+        return z
+
+    def alimentar(self, serie_diaria):
+        # Consome só os dias posteriores ao último já processado
+        if self.ultima_data is not None:
+            serie_diaria = serie_diaria[serie_diaria.index > self.ultima_data]
+        for data, valor in serie_diaria.items():
+            self.atualizar(data, float(valor))
+
+    def tabela_anomalias(self):
+        # Colunas tipadas mesmo sem anomalias (o .dt do filtro de datas precisa de datetime)
+        tabela = pd.DataFrame(self.anomalias, columns=['Data', 'Faturamento', 'Esperado', 'Z', 'Tipo'])
+        return tabela.astype({
+            'Data': 'datetime64[ns]',
+            'Faturamento': float,
+            'Esperado': float,
+            'Z': float,
+            'Tipo': object,
+        })
+
+
+def serie_diaria(df, coluna_valor='Faturamento'):
+    # Faturamento por dia, com os dias sem movimento preenchidos com 0
+    return df.groupby('Data')[coluna_valor].sum().asfreq('D').fillna(0)
+
+
+# --- MODO LOTE (vários anos, várias lojas) ---
+def detectar_em_lote(df, coluna_valor='Faturamento', coluna_loja=None,
+                     alpha=ALPHA, limiar=LIMIAR_Z, min_observacoes=MIN_OBSERVACOES):
+    # Mesma lógica do detector incremental, mas vetorizada com groupby + ewm.
+    # Recebe transações (uma linha por serviço) e devolve só os dias anômalos.
+    lojas = [coluna_loja] if coluna_loja else []
+
+    # 1. Série diária por loja (dias vazios = 0)
+    diario = (
+        df.groupby(lojas + [pd.Grouper(key='Data', freq='D')])[coluna_valor].sum()
+        .reset_index()
+    )
+    if coluna_loja:
+        diario = (
+            diario.set_index('Data').groupby(coluna_loja)[coluna_valor]
+            .apply(lambda s: s.asfreq('D').fillna(0))
+            .reset_index()
+        )
+    else:
+        diario = diario.set_index('Data')[coluna_valor].asfreq('D').fillna(0).reset_index()
+
+    diario['Dia'] = diario['Data'].dt.dayofweek
+    grupos = diario.groupby(lojas + ['Dia'])[coluna_valor]
+
+    # 2. Régua de cada dia da semana ANTES do dia avaliado (shift de 1 dentro do grupo)
+    media = grupos.transform(lambda s: s.ewm(alpha=alpha, adjust=False).mean().shift(1))
+    variancia = grupos.transform(lambda s: s.ewm(alpha=alpha, adjust=False).var(bias=True).shift(1))
+    contagem = diario.groupby(lojas + ['Dia']).cumcount()
+
+    # 3. Resíduo -> z-score
+    desvio = np.maximum(np.sqrt(variancia.fillna(0)), DESVIO_MINIMO)
+    diario['Esperado'] = media
+    diario['Z'] = (diario[coluna_valor] - media) / desvio
+
+    marcados = diario[(contagem >= min_observacoes) & (diario['Z'].abs() > limiar)].copy()
+    marcados['Tipo'] = np.where(marcados['Z'] > 0, 'Pico', 'Queda')
+    return marcados.drop(columns='Dia').reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    # Varredura completa do histórico: python anomalyDetection.py [arquivo.csv] [coluna_loja]
+    import sys
+    import time
+    from sharedData import carregar_csv
+
+    arquivo = sys.argv[1] if len(sys.argv) > 1 else 'dataLava.csv'
+    coluna_loja = sys.argv[2] if len(sys.argv) > 2 else None
+
+    df = carregar_csv(arquivo)
+    inicio = time.perf_counter()
+    resultado = detectar_em_lote(df, coluna_loja=coluna_loja)
+    duracao = time.perf_counter() - inicio
+
+    print(f"🔎 {len(df)} serviços analisados em {duracao:.2f}s")
+    print(f"🚨 {len(resultado)} dias fora do padrão:")
+    print(resultado.to_string(index=False))
@@ -0,0 +1,286 @@
+import asyncio
+import datetime
+import hashlib
+import json
+import sys
+import traceback
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+
+from sharedData import DatasetCompartilhado
+from figureCache import CacheFiguras
+from forecastJob import ler_ultima_previsao, previsao_atualizada, versao_ultima_previsao
+from liveStream import Acumuladores, iniciar_socket, iniciar_tail
+from metrics import (
+    META_SEMANAL, ROLLUPS, filtrar_periodo, calcular_kpis, prever_proximos_dias,
+)
+
+# --- API JSON (SEM STREAMLIT) ---
+# Servidor HTTP assíncrono (só biblioteca padrão) com os mesmos números do dashboard,
+# para o tablet do caixa, o bot de WhatsApp, etc.
+#
+#   GET /kpis?inicio=2025-10-01&fim=2025-10-31
+#   GET /rollup/diario | /rollup/semanal | /rollup/mensal   (?inicio=&fim=)
+#   GET /meta        (mesmos acumuladores ao vivo do velocímetro do dashboard)
+#   GET /previsao
+#
+# Uso: python apiServer.py [porta]
+
+HOST = '127.0.0.1'
+PORTA = 8502
+ARQUIVO = 'dataLava.csv'
+
+STATUS = {
+    200: 'OK',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+
+class ErroApi(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+
+def _json_default(valor):
+    # Tipos do pandas/numpy que o json não conhece
+    if isinstance(valor, (pd.Timestamp, datetime.date)):
+        return valor.isoformat()
+    if isinstance(valor, np.generic):
+        return valor.item()
+    raise TypeError(f"Tipo não serializável: {type(valor)}")
+
+
+def _tabela(df):
+    return df.to_dict(orient='records')
+
+
+def _ler_periodo(df, query):
+    # Período padrão = histórico inteiro (igual ao filtro do dashboard)
+    try:
+        inicio = query.get('inicio', [None])[0]
+        fim = query.get('fim', [None])[0]
+        data_inicial = datetime.date.fromisoformat(inicio) if inicio else df['Data'].min().date()
+        data_final = datetime.date.fromisoformat(fim) if fim else df['Data'].max().date()
+    except ValueError:
+        raise ErroApi(400, "Datas devem estar no formato AAAA-MM-DD")
+    return data_inicial, data_final
+
+
+# --- ROTAS ---
+def rota_kpis(df, query):
+    data_inicial, data_final = _ler_periodo(df, query)
+    return {'inicio': data_inicial, 'fim': data_final, **calcular_kpis(filtrar_periodo(df, data_inicial, data_final))}
+
+
+def rota_rollup(df, query, tipo):
+    if tipo not in ROLLUPS:
+        raise ErroApi(404, f"Agrupamento desconhecido: {tipo} (use {', '.join(ROLLUPS)})")
+    data_inicial, data_final = _ler_periodo(df, query)
+    tabela = ROLLUPS[tipo](filtrar_periodo(df, data_inicial, data_final))
+    return {'inicio': data_inicial, 'fim': data_final, 'tipo': tipo, 'dados': _tabela(tabela)}
+
+
+def rota_meta(ao_vivo):
+    # Igual ao velocímetro: CSV + serviços que chegaram ao vivo (liveStream.py)
+    with ao_vivo.lock:
+        estado = ao_vivo.estado()
+    ultima_data, faturamento_atual = estado['ultima_data'], estado['semana']
+    return {
+        'inicio_semana': ultima_data - pd.Timedelta(days=ultima_data.dayofweek),
+        'ultima_data': ultima_data,
+        'faturamento_atual': faturamento_atual,
+        'meta': META_SEMANAL,
+        'falta': max(META_SEMANAL - faturamento_atual, 0.0),
+        'percentual': faturamento_atual / META_SEMANAL,
+        'meta_batida': faturamento_atual >= META_SEMANAL,
+        'eventos_ao_vivo': estado['eventos'],
+    }
+
+
+def rota_previsao(snapshot, query):
+    # Preferência: artefato do job em segundo plano (se treinado com os dados atuais); senão, regressão na hora
+    df = snapshot.df
+    ultima_previsao = ler_ultima_previsao()
+    if ultima_previsao is not None and previsao_atualizada(ultima_previsao[0], snapshot):
+        artefato, df_futuro = ultima_previsao
+        modelo, gerado_em = artefato['modelo'], artefato['gerado_em']
+    else:
+        previsao = prever_proximos_dias(df, dias=7)
+        if previsao is None:
+            raise ErroApi(503, "Precisamos de mais dados para liberar a previsão")
+        _, df_futuro = previsao
+        modelo, gerado_em = 'Regressao', None
+
+    return {
+        'modelo': modelo,
+        'gerado_em': gerado_em,
+        'total_previsto': float(df_futuro['Previsao'].sum()),
+        'dias': _tabela(df_futuro[['Data', 'Previsao']]),
+    }
+
+
+def resolver(snapshot, caminho, query, ao_vivo):
+    df = snapshot.df
+    partes = [p for p in caminho.split('/') if p]
+    if partes == ['kpis']:
+        return rota_kpis(df, query)
+    if len(partes) == 2 and partes[0] == 'rollup':
+        return rota_rollup(df, query, partes[1])
+    if partes == ['meta']:
+        return rota_meta(ao_vivo)
+    if partes == ['previsao']:
+        return rota_previsao(snapshot, query)
+    raise ErroApi(404, f"Rota não encontrada: {caminho}")
+
+
+class ServidorApi:
+
+    def __init__(self, arquivo=ARQUIVO):
+        self.dataset = DatasetCompartilhado(arquivo)
+        # Mesmo LRU dos gráficos, aqui guardando (etag, corpo JSON) por (versão, rota, query)
+        self.cache = CacheFiguras(tamanho_maximo=256)
+
+        # Mesma fonte ao vivo do dashboard: o arquivo de eventos (e o socket, se a porta estiver livre).
+        # Carrega os dados e semeia ANTES do tail: a semente zeraria os eventos que o tail já reprocessou.
+        self.ao_vivo = Acumuladores()
+        snapshot = self.dataset.obter()
+        if not snapshot.df.empty:
+            self.ao_vivo.semear(snapshot)
+        try:
+            iniciar_socket()
+        except OSError:
+            pass # O dashboard já está com o socket; os eventos chegam pelo arquivo
+        iniciar_tail(self.ao_vivo)
+
+    def _responder(self, caminho, query_str):
+        # Roda numa thread (pandas/sklearn travariam o event loop)
+        snapshot = self.dataset.obter()
+        if snapshot.df.empty:
+            raise ErroApi(503, "Sem dados carregados")
+        self.ao_vivo.sincronizar(snapshot)
+
+        def construir():
+            query = parse_qs(query_str)
+            corpo = json.dumps(resolver(snapshot, caminho, query, self.ao_vivo), default=_json_default, ensure_ascii=False).encode('utf-8')
+            etag = f'"v{snapshot.versao}-{hashlib.sha1(corpo).hexdigest()[:16]}"'  # Hash do corpo cobre a previsão
+            return etag, corpo
+
+        # A previsão muda quando o job grava um artefato novo e a meta a cada evento ao vivo (mesmo sem CSV novo)
+        rota = caminho.strip('/')
+        versao_extra = versao_ultima_previsao() if rota == 'previsao' else self.ao_vivo.eventos if rota == 'meta' else None
+        return self.cache.obter(snapshot.versao, caminho, (query_str, versao_extra), construir)
+
+    async def tratar_conexao(self, reader, writer):
+        # Uma conexão pode ter várias requisições (keep-alive do HTTP/1.1)
+        try:
+            while True:
+                linha = await reader.readline()
+                if not linha:
+                    break
+
+                try:
+                    metodo, alvo, versao_http = linha.decode('latin-1').split()
+                except ValueError:
+                    await self._enviar(writer, 400, {'erro': 'Requisição inválida'}, manter=False)
+                    break
+
+                # Cabeçalhos
+                cabecalhos = {}
+                while True:
+                    linha = await reader.readline()
+                    if linha in (b'\r\n', b'\n', b''):
+                        break
+                    nome, _, valor = linha.decode('latin-1').partition(':')
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+
+                manter = cabecalhos.get('connection', '').lower() != 'close' and versao_http == 'HTTP/1.1'
+
+                # Corpo: nenhuma rota usa, mas precisa sair do stream senão vira o começo da próxima requisição
+                if 'transfer-encoding' in cabecalhos:
+                    manter = False # Chunked não é lido: responde e fecha a conexão
+                try:
+                    tamanho_corpo = int(cabecalhos.get('content-length', 0))
+                except ValueError:
+                    tamanho_corpo = -1
+                if tamanho_corpo < 0:
+                    await self._enviar(writer, 400, {'erro': 'Content-Length inválido'}, manter=False)
+                    break
+                while tamanho_corpo > 0:
+                    pedaco = await reader.read(min(tamanho_corpo, 65536))
+                    if not pedaco:
+                        raise asyncio.IncompleteReadError(b'', tamanho_corpo)
+                    tamanho_corpo -= len(pedaco)
+
+                await self._atender(writer, metodo, alvo, cabecalhos, manter)
+                if not manter:
+                    break
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _atender(self, writer, metodo, alvo, cabecalhos, manter):
+        if metodo != 'GET':
+            await self._enviar(writer, 405, {'erro': 'Só GET é suportado'}, manter)
+            return
+
+        url = urlsplit(alvo)
+        try:
+            etag, corpo = await asyncio.to_thread(self._responder, url.path, url.query)
+        except ErroApi as e:
+            await self._enviar(writer, e.status, {'erro': e.mensagem}, manter)
+            return
+        except Exception:
+            # Bug numa rota não pode derrubar a conexão: loga e responde 500
+            traceback.print_exc()
+            await self._enviar(writer, 500, {'erro': 'Erro interno no servidor'}, manter)
+            return
+
+        # Cliente já tem essa versão? Responde 304 sem corpo
+        if cabecalhos.get('if-none-match') == etag:
+            await self._enviar_bytes(writer, 304, b'', manter, etag)
+        else:
+            await self._enviar_bytes(writer, 200, corpo, manter, etag)
+
+    async def _enviar(self, writer, status, dados, manter):
+        corpo = json.dumps(dados, ensure_ascii=False).encode('utf-8')
+        await self._enviar_bytes(writer, status, corpo, manter)
+
+    async def _enviar_bytes(self, writer, status, corpo, manter, etag=None):
+        linhas = [
+            f"HTTP/1.1 {status} {STATUS[status]}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(corpo)}",
+            "Cache-Control: no-cache", # Pode guardar, mas sempre revalida com o ETag
+            f"Connection: {'keep-alive' if manter else 'close'}",
+        ]
+        if etag:
+            linhas.append(f"ETag: {etag}")
+        writer.write(("\r\n".join(linhas) + "\r\n\r\n").encode('latin-1') + corpo)
+        await writer.drain()
+
+
+async def iniciar(host=HOST, porta=PORTA, arquivo=ARQUIVO):
+    servidor_api = ServidorApi(arquivo) # Já carrega os dados antes de aceitar conexões
+
+    servidor = await asyncio.start_server(servidor_api.tratar_conexao, host, porta)
+    print(f"🚀 API no ar em http://{host}:{porta}")
+    async with servidor:
+        await servidor.serve_forever()
+
+
+if __name__ == '__main__':
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else PORTA
+    try:
+        asyncio.run(iniciar(porta=porta))
+    except KeyboardInterrupt:
+        print("\n👋 API encerrada")
@@ -0,0 +1,166 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# --- ÍNDICE DE CLIENTES ---
+# Um registro por cliente (última visita, nº de visitas, total gasto, intervalo médio),
+# atualizado incrementalmente a cada serviço. As consultas (top clientes, atrasados, RFM)
+# leem só o índice - milhares de clientes em vez de milhões de linhas.
+
+TOLERANCIA_ATRASO = 1.5   # Atrasado = sem vir há mais de 1,5x o seu intervalo médio
+MIN_VISITAS_ATRASO = 2    # Precisa de pelo menos 2 visitas para ter um intervalo
+
+# Frequência em faixas fixas de visitas (a maioria tem 1 visita: quintil não separa empates)
+FAIXAS_FREQUENCIA = [0, 1, 2, 3, 5, np.inf]   # 1 | 2 | 3 | 4-5 | 6+ visitas -> notas 1 a 5
+
+COLUNAS = ['primeira_visita', 'ultima_visita', 'visitas', 'servicos', 'total_gasto']
+
+# Segmentos RFM (Recência, Frequência, Valor) a partir das notas de 1 a 5
+SEGMENTOS_RFM = [
+    # (nome, condição)
+    ('Campeões', lambda r, f, m: (r >= 4) & (f >= 4)),
+    ('Fiéis', lambda r, f, m: (r >= 3) & (f >= 3)),
+    ('Novos', lambda r, f, m: (r >= 4) & (f <= 1)),
+    ('Em Risco', lambda r, f, m: (r <= 2) & (f >= 3)),
+    ('Hibernando', lambda r, f, m: (r <= 2)),
+]
+
+
+def _nome_cliente(valor):
+    if pd.isna(valor) or str(valor).strip() == "":
+        return None
+    return str(valor).strip()
+
+
+class IndiceClientes:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._lock_sincronizar = threading.Lock() # Evita duas sessões reconstruindo ao mesmo tempo
+        self.versao_dados = None
+        # cliente -> [primeira_visita, ultima_visita, visitas (dias distintos), servicos, total_gasto]
+        self._clientes = {}
+        self._tabela = None  # DataFrame materializado para consultas (refeito só se algo mudou)
+        self.alteracoes = 0  # Contador de mudanças (serve de chave de cache)
+
+    # --- CONSTRUÇÃO / ATUALIZAÇÃO ---
+    def registrar(self, data, cliente, valor):
+        # Um serviço novo: O(1)
+        cliente = _nome_cliente(cliente)
+        if cliente is None:
+            return
+
+        with self.lock:
+            registro = self._clientes.get(cliente)
+            if registro is None:
+                self._clientes[cliente] = [data, data, 1, 1, valor]
+            else:
+                if data > registro[1]:
+                    registro[1] = data
+                    registro[2] += 1 # Dia novo = visita nova
+                elif data < registro[0]:
+                    registro[0] = data
+                    registro[2] += 1 # Lançamento atrasado anterior à primeira visita
+                registro[3] += 1
+                registro[4] += valor
+            self._tabela = None
+            self.alteracoes += 1
+
+    def registrar_evento(self, evento, estado=None):
+        # Assinatura compatível com Acumuladores.assinar (liveStream.py)
+        self.registrar(evento['Data'], evento['Cliente'], evento['Faturamento'])
+
+    def adicionar_lote(self, df):
+        # Lote de transações (vetorizado): resume por cliente e mescla no índice
+        lote = df.assign(Cliente=df['Cliente'].map(_nome_cliente)).dropna(subset=['Cliente'])
+        resumo = lote.groupby('Cliente').agg(
+            primeira_visita=('Data', 'min'),
+            ultima_visita=('Data', 'max'),
+            visitas=('Data', 'nunique'),
+            servicos=('Data', 'size'),
+            total_gasto=('Faturamento', 'sum'),
+        )
+
+        with self.lock:
+            for cliente, primeira, ultima, visitas, servicos, total in resumo.itertuples():
+                registro = self._clientes.get(cliente)
+                if registro is None:
+                    self._clientes[cliente] = [primeira, ultima, int(visitas), int(servicos), float(total)]
+                else:
+                    # Aproximação: assume que o lote não repete dias já contados
+                    registro[0] = min(registro[0], primeira)
+                    registro[1] = max(registro[1], ultima)
+                    registro[2] += int(visitas)
+                    registro[3] += int(servicos)
+                    registro[4] += float(total)
+            self._tabela = None
+            self.alteracoes += 1
+
+    def sincronizar(self, snapshot):
+        # Versão MAIS NOVA do CSV: refaz o índice a partir dele (uma vez por versão, não por rerun).
+        # Snapshot antigo de outra sessão é ignorado para não apagar eventos ao vivo.
+        def desatualizado():
+            return self.versao_dados is None or snapshot.versao > self.versao_dados
+
+        if not desatualizado():
+            return
+        with self._lock_sincronizar:
+            if not desatualizado():
+                return
+            with self.lock:
+                self._clientes = {}
+                self._tabela = None
+            self.adicionar_lote(snapshot.df)
+            self.versao_dados = snapshot.versao
+
+    # --- CONSULTAS ---
+    def tabela(self):
+        # Índice como DataFrame (uma linha por cliente) + métricas derivadas
+        with self.lock:
+            if self._tabela is None:
+                tabela = pd.DataFrame.from_dict(self._clientes, orient='index', columns=COLUNAS)
+                tabela.index.name = 'Cliente'
+                tabela['primeira_visita'] = pd.to_datetime(tabela['primeira_visita'])
+                tabela['ultima_visita'] = pd.to_datetime(tabela['ultima_visita'])
+
+                dias_ativo = (tabela['ultima_visita'] - tabela['primeira_visita']).dt.days
+                tabela['intervalo_medio'] = np.where(tabela['visitas'] > 1, dias_ativo / (tabela['visitas'] - 1).clip(lower=1), np.nan)
+                tabela['ticket_medio'] = tabela['total_gasto'] / tabela['servicos']
+                self._tabela = tabela
+            return self._tabela
+
+    def top_clientes(self, n=10, por='total_gasto'):
+        return self.tabela().nlargest(n, por)
+
+    def clientes_atrasados(self, hoje, tolerancia=TOLERANCIA_ATRASO):
+        # "Já deviam ter voltado": dias sem vir > tolerância x intervalo médio do próprio cliente
+        tabela = self.tabela()
+        tabela = tabela[tabela['visitas'] >= MIN_VISITAS_ATRASO].copy()
+        tabela['dias_sem_vir'] = (hoje - tabela['ultima_visita']).dt.days
+        tabela['risco_churn'] = tabela['dias_sem_vir'] / tabela['intervalo_medio'].clip(lower=1)
+        atrasados = tabela[tabela['risco_churn'] > tolerancia]
+        return atrasados.sort_values('risco_churn', ascending=False)
+
+    def segmentos_rfm(self, hoje):
+        # Notas de 1 a 5: R e M por quintil, F por faixa de visitas
+        tabela = self.tabela().copy()
+        if tabela.empty:
+            return tabela.assign(R=[], F=[], M=[], Segmento=[])
+
+        tabela['recencia'] = (hoje - tabela['ultima_visita']).dt.days
+
+        def nota(serie, crescente=True):
+            # Percentil com empates na média: valores iguais sempre recebem a mesma nota
+            percentil = serie.rank(method='average', ascending=crescente, pct=True)
+            return np.ceil(percentil * 5).clip(1, 5).astype(int)
+
+        r = nota(tabela['recencia'], crescente=False) # Veio há pouco = nota alta
+        f = pd.cut(tabela['visitas'], bins=FAIXAS_FREQUENCIA, labels=[1, 2, 3, 4, 5]).astype(int)
+        m = nota(tabela['total_gasto'])
+        tabela['R'], tabela['F'], tabela['M'] = r, f, m
+
+        tabela['Segmento'] = 'Ocasionais'
+        for nome, condicao in reversed(SEGMENTOS_RFM): # Os primeiros da lista têm prioridade
+            tabela.loc[condicao(r, f, m), 'Segmento'] = nome
+        return tabela
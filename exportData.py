@@ -0,0 +1,96 @@
+import io
+import pandas as pd
+
+# --- EXPORTAÇÃO EM PEDAÇOS (STREAMING) ---
+# Os geradores abaixo entregam o arquivo aos poucos (chunk por chunk),
+# assim a exportação começa na hora e a memória fica limitada ao tamanho do chunk.
+
+TAMANHO_CHUNK = 5000
+
+
+def formatar_chunk_br(chunk):
+    # Formato brasileiro: datas dd/mm/aaaa e números com vírgula decimal
+    chunk = chunk.copy()
+    for coluna in chunk.columns:
+        if pd.api.types.is_datetime64_any_dtype(chunk[coluna]):
+            chunk[coluna] = chunk[coluna].dt.strftime('%d/%m/%Y')
+        elif pd.api.types.is_float_dtype(chunk[coluna]):
+            chunk[coluna] = chunk[coluna].map(lambda x: f"{x:.2f}".replace('.', ',') if pd.notna(x) else "")
+    return chunk
+
+
+def gerar_csv(df, tamanho_chunk=TAMANHO_CHUNK):
+    # Gera o CSV em bytes, um pedaço por vez (separador ';' para abrir certinho no Excel BR)
+    for inicio in range(0, max(len(df), 1), tamanho_chunk):
+        chunk = formatar_chunk_br(df.iloc[inicio:inicio + tamanho_chunk])
+        texto = chunk.to_csv(index=False, header=(inicio == 0), sep=';')
+
+        # BOM no primeiro pedaço para o Excel reconhecer os acentos
+        encoding = 'utf-8-sig' if inicio == 0 else 'utf-8'
+        yield texto.encode(encoding)
+
+
+class _SaidaEmPedacos(io.RawIOBase):
+    # "Arquivo" que só acumula o que foi escrito desde a última coleta.
+    # Guarda a posição total para o rodapé do Parquet apontar os offsets certos.
+    def __init__(self):
+        self._pedacos = []
+        self._posicao = 0
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        dados = bytes(dados)
+        self._pedacos.append(dados)
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def coletar(self):
+        dados = b"".join(self._pedacos)
+        self._pedacos = []
+        return dados
+
+
+def gerar_parquet(df, tamanho_chunk=TAMANHO_CHUNK):
+    # Gera o Parquet em bytes, escrevendo um row group por chunk (sem formatação BR: tipos nativos)
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    saida = _SaidaEmPedacos()
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+
+    with pq.ParquetWriter(saida, schema) as writer:
+        for inicio in range(0, len(df), tamanho_chunk):
+            chunk = df.iloc[inicio:inicio + tamanho_chunk]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+            dados = saida.coletar()
+            if dados:
+                yield dados
+
+    # Rodapé (metadados) escrito ao fechar o writer
+    yield saida.coletar()
+
+
+# Formatos disponíveis: nome -> (gerador, extensão, mime)
+FORMATOS = {
+    'CSV': (gerar_csv, 'csv', 'text/csv'),
+    'Parquet': (gerar_parquet, 'parquet', 'application/octet-stream'),
+}
+
+
+def exportar(df, formato, tamanho_chunk=TAMANHO_CHUNK):
+    # Atalho: devolve o gerador do formato escolhido
+    gerador, _, _ = FORMATOS[formato]
+    return gerador(df, tamanho_chunk)
+
+
+def salvar_arquivo(df, caminho, formato, tamanho_chunk=TAMANHO_CHUNK):
+    # Escreve direto no disco, pedaço por pedaço
+    with open(caminho, 'wb') as arquivo:
+        for pedaco in exportar(df, formato, tamanho_chunk):
+            arquivo.write(pedaco)
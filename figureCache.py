@@ -0,0 +1,64 @@
+import threading
+from collections import OrderedDict
+
+# --- CACHE DE GRÁFICOS (LRU) ---
+# Guarda a figura do Plotly já montada e estilizada.
+# Chave = (versão dos dados, id do gráfico, parâmetros do filtro): se nada disso mudou,
+# o rerun do Streamlit reaproveita a figura em vez de refazer px + update_* do zero.
+# As figuras são compartilhadas entre sessões: depois de guardadas, NÃO devem ser alteradas.
+# Guardamos o go.Figure (e não o dict/JSON): o st.plotly_chart valida e serializa a cada chamada
+# de qualquer jeito, e um dict é validado remontando uma go.Figure - sai mais caro que a própria figura.
+
+TAMANHO_MAXIMO = 128
+
+
+class CacheFiguras:
+
+    def __init__(self, tamanho_maximo=TAMANHO_MAXIMO):
+        self.tamanho_maximo = tamanho_maximo
+        self._figuras = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0
+
+    def obter(self, versao, id_grafico, parametros, construtor):
+        # Devolve a figura do cache ou chama construtor() para montar (e guardar) uma nova
+        chave = (versao, id_grafico, parametros)
+
+        with self._lock:
+            if chave in self._figuras:
+                self._figuras.move_to_end(chave) # Mais recente no fim
+                self.acertos += 1
+                return self._figuras[chave]
+            self.falhas += 1
+
+        # Monta fora do lock para não travar as outras sessões
+        figura = construtor()
+
+        with self._lock:
+            self._figuras[chave] = figura
+            self._figuras.move_to_end(chave)
+
+            # LRU: remove os menos usados quando passar do limite
+            while len(self._figuras) > self.tamanho_maximo:
+                self._figuras.popitem(last=False)
+                self.despejos += 1
+
+        return figura
+
+    def limpar(self):
+        with self._lock:
+            self._figuras.clear()
+
+    def metricas(self):
+        total = self.acertos + self.falhas
+        return {
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'despejos': self.despejos,
+            'tamanho': len(self._figuras),
+            'taxa_acerto': self.acertos / total if total else 0.0,
+        }
@@ -0,0 +1,192 @@
+import argparse
+import datetime
+import json
+import os
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from sharedData import carregar_csv
+from anomalyDetection import serie_diaria
+from metrics import prever_proximos_dias
+
+# --- JOB DE PREVISÃO EM SEGUNDO PLANO ---
+# Treina os modelos pesados do predictionAvg3.0.py (SARIMA, Holt-Winters, Ensemble) fora do
+# dashboard, a cada X minutos ou quando o CSV muda, e grava o resultado em disco (JSON versionado).
+# O dashboard só LÊ o último arquivo: previsão pronta, zero espera para o usuário.
+#
+# Uso:
+#   python forecastJob.py --modelo Ensemble --intervalo 60   (minutos)
+#   python forecastJob.py --uma-vez
+
+ARQUIVO = 'dataLava.csv'
+PASTA_PREVISOES = 'previsoes'
+ULTIMA = 'ultima.json'
+MANTER_VERSOES = 20   # Quantos artefatos antigos guardar
+DIAS_PREVISAO = 7
+
+
+# --- MODELOS (recebem as transações, devolvem array com a previsão diária) ---
+def modelo_regressao(df, dias):
+    resultado = prever_proximos_dias(df, dias)
+    if resultado is None:
+        raise ValueError("Dados insuficientes para a regressão")
+    return resultado[1]['Previsao'].values
+
+
+def modelo_holt_winters(df, dias):
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+    y = serie_diaria(df)
+    hw = ExponentialSmoothing(y, seasonal_periods=7, trend='add', seasonal='add').fit()
+    return np.asarray(hw.forecast(dias))
+
+
+def modelo_sarima(df, dias):
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    y = serie_diaria(df)
+    modelo = SARIMAX(y,
+                     order=(1, 0, 1),
+                     seasonal_order=(1, 1, 1, 7),
+                     enforce_stationarity=False,
+                     enforce_invertibility=False)
+    resultado = modelo.fit(disp=False)
+    return np.asarray(resultado.get_forecast(steps=dias).predicted_mean)
+
+
+def modelo_ensemble(df, dias):
+    # "Média dos Campeões" (Regressão + Holt-Winters)
+    return (modelo_regressao(df, dias) + modelo_holt_winters(df, dias)) / 2
+
+
+MODELOS = {
+    'Regressao': modelo_regressao,
+    'HoltWinters': modelo_holt_winters,
+    'SARIMA': modelo_sarima,
+    'Ensemble': modelo_ensemble,
+}
+
+
+# --- ARTEFATOS (JSON versionado em disco) ---
+def _gravar_atomico(caminho, dados):
+    # Escreve num temporário e troca de uma vez: o leitor nunca vê arquivo pela metade
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def _limpar_antigos(pasta, manter):
+    artefatos = sorted(f for f in os.listdir(pasta) if f.startswith('previsao_') and f.endswith('.json'))
+    for nome in artefatos[:-manter]:
+        os.remove(os.path.join(pasta, nome))
+
+
+def gerar_previsao(modelo, arquivo=ARQUIVO, pasta=PASTA_PREVISOES, dias=DIAS_PREVISAO):
+    # Treina um modelo e grava o artefato (+ atualiza o ultima.json)
+    info = os.stat(arquivo)
+    df = carregar_csv(arquivo)
+
+    inicio = time.perf_counter()
+    valores = np.maximum(MODELOS[modelo](df, dias), 0) # Não existe faturamento negativo
+    duracao = time.perf_counter() - inicio
+
+    dados_ate = df['Data'].max()
+    datas = pd.date_range(start=dados_ate + pd.Timedelta(days=1), periods=dias)
+    agora = datetime.datetime.now()
+    id_artefato = f"{agora:%Y%m%d-%H%M%S}-{modelo}"
+
+    artefato = {
+        'id': id_artefato,
+        'modelo': modelo,
+        'gerado_em': agora.isoformat(timespec='seconds'),
+        'dados_ate': dados_ate.date().isoformat(),
+        'assinatura_dados': [info.st_mtime_ns, info.st_size],
+        'duracao_treino_s': round(duracao, 3),
+        'previsao': [
+            {'Data': data.date().isoformat(), 'Previsao': float(valor)}
+            for data, valor in zip(datas, valores)
+        ],
+    }
+
+    os.makedirs(pasta, exist_ok=True)
+    _gravar_atomico(os.path.join(pasta, f"previsao_{id_artefato}.json"), artefato)
+    _gravar_atomico(os.path.join(pasta, ULTIMA), artefato)
+    _limpar_antigos(pasta, MANTER_VERSOES)
+    return artefato
+
+
+def versao_ultima_previsao(pasta=PASTA_PREVISOES):
+    # Muda toda vez que o job grava uma previsão nova (serve de chave de cache)
+    try:
+        return os.stat(os.path.join(pasta, ULTIMA)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def ler_ultima_previsao(pasta=PASTA_PREVISOES):
+    # Usado pelo dashboard/API: devolve (artefato, df_futuro) ou None se o job ainda não rodou
+    try:
+        with open(os.path.join(pasta, ULTIMA), encoding='utf-8') as arquivo:
+            artefato = json.load(arquivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    df_futuro = pd.DataFrame(artefato['previsao'])
+    df_futuro['Data'] = pd.to_datetime(df_futuro['Data'])
+    df_futuro['Dia_Semana'] = df_futuro['Data'].dt.dayofweek
+    return artefato, df_futuro
+
+
+def previsao_atualizada(artefato, snapshot):
+    # O artefato só vale se foi treinado com o MESMO arquivo do snapshot: assinatura (mtime, tamanho) igual.
+    # Comparar só o último dia deixaria passar correções em dias antigos do CSV.
+    assinatura = artefato.get('assinatura_dados')
+    return snapshot.assinatura is not None and assinatura is not None and tuple(assinatura) == tuple(snapshot.assinatura)
+
+
+# --- AGENDADOR ---
+def agendar(modelo, intervalo_min, arquivo=ARQUIVO, pasta=PASTA_PREVISOES, checagem_s=10):
+    # Um modelo por agendador: o ultima.json guarda só UM artefato (o que o dashboard/API leem)
+    # Retreina quando o intervalo vence OU quando o CSV muda (checado a cada poucos segundos)
+    ultima_assinatura = None
+    proxima_execucao = 0
+
+    while True:
+        try:
+            info = os.stat(arquivo)
+            assinatura = (info.st_mtime_ns, info.st_size)
+        except FileNotFoundError:
+            print(f"⚠️ Arquivo {arquivo} não encontrado, tentando de novo...")
+            time.sleep(checagem_s)
+            continue
+
+        if assinatura != ultima_assinatura or time.monotonic() >= proxima_execucao:
+            try:
+                artefato = gerar_previsao(modelo, arquivo, pasta)
+                print(f"✅ {artefato['id']}: R$ {sum(p['Previsao'] for p in artefato['previsao']):,.2f} "
+                      f"em 7 dias (treino {artefato['duracao_treino_s']}s)")
+            except Exception as e:
+                print(f"❌ Erro no modelo {modelo}: {e}")
+            ultima_assinatura = assinatura
+            proxima_execucao = time.monotonic() + intervalo_min * 60
+
+        time.sleep(checagem_s)
+
+
+if __name__ == '__main__':
+    warnings.filterwarnings("ignore") # statsmodels avisa bastante durante o ajuste
+
+    parser = argparse.ArgumentParser(description="Job de previsão em segundo plano")
+    parser.add_argument('--modelo', choices=list(MODELOS), default='Ensemble')
+    parser.add_argument('--intervalo', type=float, default=60, help="Minutos entre retreinos")
+    parser.add_argument('--uma-vez', action='store_true', help="Treina uma vez e sai")
+    args = parser.parse_args()
+
+    if args.uma_vez:
+        artefato = gerar_previsao(args.modelo)
+        print(f"✅ Previsão gravada: {artefato['id']}")
+    else:
+        print(f"⏳ Agendador iniciado: {args.modelo} a cada {args.intervalo:g} min (ou quando o CSV mudar)")
+        agendar(args.modelo, args.intervalo)
@@ -0,0 +1,230 @@
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from metrics import faturamento_semana_atual
+
+# --- INGESTÃO AO VIVO DE SERVIÇOS ---
+# Cada serviço lançado no caixa vira um evento (JSON) que atualiza os acumuladores
+# de dia / semana / mês em O(1). O velocímetro da meta lê daqui, sem varrer o DataFrame.
+#
+# Fontes de eventos:
+#   - Arquivo "tail":   linhas JSON anexadas ao ARQUIVO_EVENTOS -> Acumuladores.registrar
+#   - Socket TCP local: uma linha JSON por evento (porta PORTA_EVENTOS), gravada no ARQUIVO_EVENTOS
+#   - Fila em memória:  queue.Queue (para testes / outros módulos do mesmo processo)
+#
+# O arquivo é o registro único dos eventos: cada processo (dashboard, API) segue o mesmo arquivo
+# desde o início, então todos mostram os mesmos números. Ao regravar o dataLava.csv com esses
+# serviços, esvazie o ARQUIVO_EVENTOS (o CSV novo já contém os eventos).
+#
+# Evento: {"Data": "19/10/2026", "Cliente": "Cadu", "Servico": "Lavagem simples", "Faturamento": 50.0}
+# (sem "Data" = agora)
+
+HOST_EVENTOS = '127.0.0.1'
+PORTA_EVENTOS = 8503
+ARQUIVO_EVENTOS = 'eventos.jsonl'
+
+
+def _parse_data(valor):
+    if not valor:
+        return pd.Timestamp.now().normalize()
+    # Mesmo formato do CSV (dd/mm/aaaa), mas aceita ISO também
+    formato = '%d/%m/%Y' if '/' in str(valor) else None
+    return pd.to_datetime(valor, format=formato).normalize()
+
+
+def ler_evento(linha):
+    # Converte uma linha JSON em evento; devolve None se vier quebrada
+    try:
+        dados = json.loads(linha)
+        return {
+            'Data': _parse_data(dados.get('Data')),
+            'Cliente': dados.get('Cliente'),
+            'Servico': dados.get('Servico'),
+            'Faturamento': float(dados['Faturamento']),
+        }
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class Acumuladores:
+    # Totais correntes de dia, semana (Segunda a Domingo) e mês.
+    # registrar() é O(1): soma no período atual ou "vira a página" se o evento é de um período novo.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.versao_dados = None   # Versão do dataset usada na semente
+        self.eventos = 0           # Quantos eventos ao vivo entraram desde a semente
+        self.ultima_data = None
+        self.dia = self.semana = self.mes = 0.0
+        self.servicos_dia = 0
+        self._ouvintes = []
+
+    def _semear(self, snapshot):
+        # Ponto de partida a partir do CSV (uma varredura por VERSÃO dos dados, não por rerun).
+        # Quando o CSV é regravado ele já contém os eventos anteriores, então zeramos o contador ao vivo.
+        # Chamar com self.lock já adquirido.
+        df = snapshot.df
+        inicio_semana, ultima_data, faturamento_semana = faturamento_semana_atual(df)
+        do_dia = df[df['Data'] == ultima_data]
+        do_mes = df[df['Data'] >= ultima_data.replace(day=1)]
+
+        self.versao_dados = snapshot.versao
+        self.eventos = 0
+        self.ultima_data = ultima_data
+        self.semana = faturamento_semana
+        self.dia = float(do_dia['Faturamento'].sum())
+        self.servicos_dia = len(do_dia)
+        self.mes = float(do_mes['Faturamento'].sum())
+
+    def semear(self, snapshot):
+        with self.lock:
+            self._semear(snapshot)
+
+    def sincronizar(self, snapshot):
+        # Chamar a cada rerun: só refaz a semente quando chega uma versão MAIS NOVA do CSV.
+        # Uma sessão que ainda segura o snapshot antigo (durante a troca) não pode voltar os totais.
+        with self.lock:
+            if self.versao_dados is None or snapshot.versao > self.versao_dados:
+                self._semear(snapshot)
+
+    def registrar(self, evento):
+        data, valor = evento['Data'], evento['Faturamento']
+
+        with self.lock:
+            if self.ultima_data is not None and data < self.ultima_data:
+                # Lançamento atrasado: entra nos totais só se for do mesmo período
+                mesma_semana = data.to_period('W-SUN') == self.ultima_data.to_period('W-SUN')
+                mesmo_mes = data.to_period('M') == self.ultima_data.to_period('M')
+                self.semana += valor if mesma_semana else 0.0
+                self.mes += valor if mesmo_mes else 0.0
+            else:
+                # Virada de dia / semana / mês zera o acumulador correspondente
+                if self.ultima_data is None or data != self.ultima_data:
+                    self.dia, self.servicos_dia = 0.0, 0
+                if self.ultima_data is None or data.to_period('W-SUN') != self.ultima_data.to_period('W-SUN'):
+                    self.semana = 0.0
+                if self.ultima_data is None or data.to_period('M') != self.ultima_data.to_period('M'):
+                    self.mes = 0.0
+
+                self.ultima_data = data
+                self.dia += valor
+                self.servicos_dia += 1
+                self.semana += valor
+                self.mes += valor
+
+            self.eventos += 1
+            estado = self.estado()
+
+        # Avisa quem estiver ouvindo (fora do lock)
+        for ouvinte in list(self._ouvintes):
+            ouvinte(evento, estado)
+
+    def estado(self):
+        return {
+            'ultima_data': self.ultima_data,
+            'dia': self.dia,
+            'servicos_dia': self.servicos_dia,
+            'semana': self.semana,
+            'mes': self.mes,
+            'eventos': self.eventos,
+        }
+
+    def assinar(self, ouvinte):
+        # ouvinte(evento, estado) é chamado a cada evento
+        self._ouvintes.append(ouvinte)
+
+
+# --- FONTES DE EVENTOS ---
+_lock_arquivo = threading.Lock()
+
+
+def gravar_evento(linha, caminho=ARQUIVO_EVENTOS):
+    # Anexa o evento ao arquivo; os processos que seguem o arquivo (tail) registram
+    with _lock_arquivo, open(caminho, 'a', encoding='utf-8') as arquivo:
+        arquivo.write(linha.strip() + '\n')
+
+
+class _TratadorSocket(socketserver.StreamRequestHandler):
+    def handle(self):
+        for linha in self.rfile:
+            linha = linha.decode('utf-8')
+            if ler_evento(linha) is None:
+                self.wfile.write(b'ERRO\n')
+            else:
+                gravar_evento(linha, self.server.caminho)
+                self.wfile.write(b'OK\n')
+
+
+class _ServidorEventos(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def iniciar_socket(caminho=ARQUIVO_EVENTOS, host=HOST_EVENTOS, porta=PORTA_EVENTOS):
+    # Sobe o servidor TCP numa thread; levanta OSError se a porta já estiver em uso
+    # (basta um processo com o socket: os outros recebem os eventos pelo arquivo)
+    servidor = _ServidorEventos((host, porta), _TratadorSocket)
+    servidor.caminho = caminho
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def _seguir_arquivo(acumuladores, caminho, intervalo):
+    # "tail -f": lê o arquivo desde o início e depois só o que for anexado
+    posicao = 0
+    while True:
+        if os.path.exists(caminho):
+            if os.path.getsize(caminho) < posicao:
+                posicao = 0 # Arquivo foi truncado/recriado
+            with open(caminho, encoding='utf-8') as arquivo:
+                arquivo.seek(posicao)
+                while True:
+                    linha = arquivo.readline()
+                    if not linha.endswith('\n'):
+                        break # Linha incompleta: espera o resto chegar
+                    posicao = arquivo.tell()
+                    evento = ler_evento(linha)
+                    if evento is not None:
+                        acumuladores.registrar(evento)
+        time.sleep(intervalo)
+
+
+def iniciar_tail(acumuladores, caminho=ARQUIVO_EVENTOS, intervalo=1.0):
+    thread = threading.Thread(target=_seguir_arquivo, args=(acumuladores, caminho, intervalo), daemon=True)
+    thread.start()
+    return thread
+
+
+def iniciar_fila(acumuladores):
+    # Fila em memória: fila.put(evento_dict) de qualquer thread do processo
+    fila = queue.Queue()
+
+    def consumir():
+        while True:
+            acumuladores.registrar(fila.get())
+
+    threading.Thread(target=consumir, daemon=True).start()
+    return fila
+
+
+if __name__ == '__main__':
+    # Envia um evento de teste para o dashboard:
+    #   python liveStream.py 50 "Gilmar Santana" "Lavagem carro simples"
+    valor = float(sys.argv[1]) if len(sys.argv) > 1 else 50.0
+    evento = {
+        'Data': pd.Timestamp.now().strftime('%d/%m/%Y'),
+        'Cliente': sys.argv[2] if len(sys.argv) > 2 else None,
+        'Servico': sys.argv[3] if len(sys.argv) > 3 else None,
+        'Faturamento': valor,
+    }
+    with socket.create_connection((HOST_EVENTOS, PORTA_EVENTOS)) as conexao:
+        conexao.sendall((json.dumps(evento, ensure_ascii=False) + '\n').encode('utf-8'))
+        print(f"📨 Evento enviado: R$ {valor:.2f} -> {conexao.makefile().readline().strip()}")
@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import time
+
+# --- TESTE DE CARGA DA API ---
+# Abre N conexões keep-alive simultâneas e dispara requisições em sequência em cada uma.
+# Mostra requisições por segundo e latência (p50 / p95 / máx).
+#
+# Uso (com a API rodando: python apiServer.py):
+#   python loadTest.py --conexoes 50 --requisicoes 200
+#   python loadTest.py --etag   (reenvia o ETag recebido -> testa o caminho do 304)
+
+ROTAS = [
+    '/kpis',
+    '/kpis?inicio=2025-10-01&fim=2025-10-31',
+    '/rollup/diario',
+    '/rollup/semanal',
+    '/rollup/mensal',
+    '/meta',
+    '/previsao',
+]
+
+
+async def ler_resposta(reader):
+    # Lê status + cabeçalhos + corpo (Content-Length)
+    status = int((await reader.readline()).split()[1])
+    cabecalhos = {}
+    while True:
+        linha = await reader.readline()
+        if linha in (b'\r\n', b''):
+            break
+        nome, _, valor = linha.decode('latin-1').partition(':')
+        cabecalhos[nome.strip().lower()] = valor.strip()
+    await reader.readexactly(int(cabecalhos.get('content-length', 0)))
+    return status, cabecalhos
+
+
+async def cliente(host, porta, requisicoes, usar_etag, latencias, status_contagem):
+    reader, writer = await asyncio.open_connection(host, porta)
+    etags = {}
+    try:
+        for i in range(requisicoes):
+            rota = ROTAS[i % len(ROTAS)]
+            extra = f"If-None-Match: {etags[rota]}\r\n" if usar_etag and rota in etags else ""
+            pedido = f"GET {rota} HTTP/1.1\r\nHost: {host}\r\n{extra}\r\n"
+
+            inicio = time.perf_counter()
+            writer.write(pedido.encode('latin-1'))
+            await writer.drain()
+            status, cabecalhos = await ler_resposta(reader)
+            latencias.append(time.perf_counter() - inicio)
+
+            status_contagem[status] = status_contagem.get(status, 0) + 1
+            if 'etag' in cabecalhos:
+                etags[rota] = cabecalhos['etag']
+    finally:
+        writer.close()
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * p), len(ordenados) - 1)]
+
+
+async def main(args):
+    latencias = []
+    status_contagem = {}
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*[
+        cliente(args.host, args.porta, args.requisicoes, args.etag, latencias, status_contagem)
+        for _ in range(args.conexoes)
+    ])
+    duracao = time.perf_counter() - inicio
+
+    total = len(latencias)
+    print(f"📊 {total} requisições em {duracao:.2f}s ({args.conexoes} conexões)")
+    print(f"⚡ {total / duracao:,.0f} req/s")
+    print(f"⏱️ Latência: p50 {percentil(latencias, 0.50) * 1000:.1f} ms | "
+          f"p95 {percentil(latencias, 0.95) * 1000:.1f} ms | máx {max(latencias) * 1000:.1f} ms")
+    print(f"📬 Status: {dict(sorted(status_contagem.items()))}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Teste de carga da API do Lava Jato")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8502)
+    parser.add_argument('--conexoes', type=int, default=20)
+    parser.add_argument('--requisicoes', type=int, default=100, help="Requisições por conexão")
+    parser.add_argument('--etag', action='store_true', help="Reenvia If-None-Match (respostas 304)")
+    asyncio.run(main(parser.parse_args()))
@@ -1,53 +1,82 @@
+import os
+import tempfile
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import numpy as np
+from exportData import FORMATOS, salvar_arquivo
+from sharedData import DatasetCompartilhado, Snapshot
+from anomalyDetection import DetectorAnomalias, serie_diaria
+from figureCache import CacheFiguras
+from forecastJob import ler_ultima_previsao, previsao_atualizada
+from liveStream import Acumuladores, PORTA_EVENTOS, iniciar_socket, iniciar_tail
+from customerIndex import IndiceClientes
+from metrics import (
+    META_SEMANAL, ORDEM_DIAS, filtrar_periodo, calcular_kpis,
+    rollup_diario, rollup_semanal, rollup_mensal, prever_proximos_dias, formatar_reais,
+)
 
 # Configuração da Página (Título e Layout)
 st.set_page_config(page_title="Dashboard Lava-Jato", layout="wide")
 
-# --- FUNÇÃO DE CARREGAMENTO E TRATAMENTO DE DADOS (ETL - Extrair, transformar e carregar) ---
-@st.cache_data
-def load_data():
-    file = "dataLava.csv"
+# --- CARREGAMENTO DE DADOS (ETL em sharedData.py) ---
+# cache_resource: um único dataset por processo, compartilhado por todas as sessões (sem cópias)
+@st.cache_resource
+def get_dataset():
+    return DatasetCompartilhado("dataLava.csv")
+
+# Detector de anomalias também é único por processo: cada dia novo só atualiza o estado (O(1)).
+# Um detector por versão dos dados: se um dia antigo for corrigido no CSV, o histórico é reaprendido
+# (2 entradas para a sessão que ainda está na versão anterior não forçar reconstrução)
+@st.cache_resource(max_entries=2)
+def get_detector(versao):
+    return DetectorAnomalias()
+
+# Série diária (groupby no histórico inteiro) também só uma vez por versão, não a cada rerun.
+# Compartilhada entre as sessões: somente leitura.
+@st.cache_resource(max_entries=2)
+def get_serie_diaria(versao, _df):
+    return serie_diaria(_df)
+
+# Cache de gráficos (LRU) compartilhado: figura pronta por (versão, gráfico, filtro)
+@st.cache_resource
+def get_cache_figuras():
+    return CacheFiguras()
+
+# Velocímetro tem um cache próprio (pequeno): muda a cada evento ao vivo e não pode despejar os gráficos do LRU principal
+@st.cache_resource
+def get_cache_meta():
+    return CacheFiguras(tamanho_maximo=2)
+
+# Acumuladores ao vivo + índice de clientes + fontes de eventos (socket local grava no eventos.jsonl,
+# que é seguido), uma vez por processo. O índice é refeito por versão do CSV e atualizado a cada serviço (O(1)).
+# Semente e assinatura ANTES do tail: o tail reprocessa o eventos.jsonl inteiro e quem chegasse depois
+# perderia esses eventos (a semente zeraria os totais, o índice nem os receberia).
+@st.cache_resource
+def get_ao_vivo(_snapshot):
+    acumuladores = Acumuladores()
+    acumuladores.semear(_snapshot)
+    indice = IndiceClientes()
+    indice.sincronizar(_snapshot)
+    acumuladores.assinar(indice.registrar_evento)
     try:
-        # Carregando os dados 
-        df = pd.read_csv(file)
-
-        # Limpando os dados
-        df = df.dropna(subset=['Data', 'Valor (R$)']) # Remove linhas vazias
-
-        # Convertendo a coluna 'Data' para o formato datetime
-        df['Data'] = pd.to_datetime(df['Data'], format='%d/%m/%Y', dayfirst=True, errors='coerce')
-        df = df.dropna(subset=['Data']) # Remove datas inválidas
-
-        # Renomeando colunas para facilitar o uso
-        df.rename(columns={'Valor (R$)': 'Faturamento', 'Descrição Original': 'Servico'}, inplace=True)
-
-        # Extraindo novas colunas de data para auxiliar nas análises
-        df['Dia_Semana'] = df['Data'].dt.day_name()
-        df['Mes'] = df['Data'].dt.strftime('%Y-%m')
-        df['Semana_Ano'] = df['Data'].dt.isocalendar().week
+        iniciar_socket()
+    except OSError as e:
+        print(f"Socket de eventos indisponível (porta {PORTA_EVENTOS}): {e}")
+    iniciar_tail(acumuladores)
+    return acumuladores, indice
 
-
-        # Traduzindo os dias para o gráfico ficar bonito em PT-BR
-        mapa_dias = {
-            'Monday': 'Segunda', 'Tuesday': 'Terça', 'Wednesday': 'Quarta',
-            'Thursday': 'Quinta', 'Friday': 'Sexta', 'Saturday': 'Sábado', 'Sunday': 'Domingo'
-        }
-        df['Dia_Semana_PT'] = df['Dia_Semana'].map(mapa_dias)   
-
-        # Ordenando por data
-        df = df.sort_values('Data')
-
-        return df
-    
+def load_data():
+    try:
+        return get_dataset().obter()
     except FileNotFoundError:
-        st.error(f"Erro ao carregar os dados: {file}")
-        return pd.DataFrame()  # Retorna um DataFrame vazio em caso de erro
-    
-df = load_data()
+        st.error("Erro ao carregar os dados: dataLava.csv")
+        return Snapshot(0, pd.DataFrame())  # Retorna um DataFrame vazio em caso de erro
+
+snapshot = load_data()
+df = snapshot.df  # Somente leitura: compartilhado entre as sessões
+cache_figuras = get_cache_figuras()
 
 if not df.empty:
 
@@ -61,27 +90,21 @@ if not df.empty:
     data_final = st.sidebar.date_input("Data Final", data_max)
 
     # Aplicando o filtro
-    df_filtrado = df[(df['Data'].dt.date >= data_inicial) & (df['Data'].dt.date <= data_final)]
+    df_filtrado = filtrar_periodo(df, data_inicial, data_final)
 
     # --- CABEÇALHO E KPIs (Indicadores-chave de desempenho) ---
     st.title("🚿🚗 Dashboard Financeiro - Gorgônio Lava Jato")
     st.markdown("---")
 
-    # Cálculos dos indicadores
-    faturamento_total = df_filtrado['Faturamento'].sum()
-    qtd_servicos = len(df_filtrado)
-    ticket_medio = faturamento_total / qtd_servicos if qtd_servicos > 0 else 0
-    
-    # Identificando o melhor dia da semana
-    faturamento_por_dia = df_filtrado.groupby('Dia_Semana_PT')['Faturamento'].sum()
-    melhor_dia = faturamento_por_dia.idxmax() if not faturamento_por_dia.empty else "N/A"
+    # Cálculos dos indicadores (metrics.py)
+    kpis = calcular_kpis(df_filtrado)
 
     # Exibindo KPIs em colunas
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Faturamento Total", f"R$ {faturamento_total:,.2f}")
-    col2.metric("Serviços Realizados", qtd_servicos)
-    col3.metric("Ticket Médio", f"R$ {ticket_medio:,.2f}")
-    col4.metric("Melhor Dia da Semana", melhor_dia)
+    col1.metric("Faturamento Total", f"R$ {kpis['faturamento_total']:,.2f}")
+    col2.metric("Serviços Realizados", kpis['qtd_servicos'])
+    col3.metric("Ticket Médio", f"R$ {kpis['ticket_medio']:,.2f}")
+    col4.metric("Melhor Dia da Semana", kpis['melhor_dia'])
 
     st.markdown("---")
 
@@ -91,57 +114,96 @@ if not df.empty:
     st.sidebar.markdown("---")
     st.sidebar.header("🎯 Meta da Semana")
 
-    # Definindo a Meta (R$)
-    META_SEMANAL = 2000.00  
-    
-    # Calculando o Faturamento da Semana Atual
-    ultima_data_arquivo = df['Data'].max()
+    # Faturamento da Semana Atual vem dos acumuladores ao vivo (liveStream.py): O(1), sem varrer o df.
+    # A semente (Segunda-feira até a última data do arquivo) só é refeita quando o CSV muda.
+    ao_vivo, indice_clientes = get_ao_vivo(snapshot)
+    ao_vivo.sincronizar(snapshot)
+
+    # Fragmento: só este pedaço roda de novo a cada 2s, mostrando os serviços que chegaram ao vivo
+    @st.fragment(run_every="2s")
+    def widget_meta():
+        # Valor e chave lidos juntos (sob o lock): a figura guardada sempre corresponde à chave
+        with ao_vivo.lock:
+            estado = ao_vivo.estado()
+            versao_ao_vivo = ao_vivo.versao_dados
+        faturamento_atual = estado['semana']
+        
+        # Criando o Gráfico de Velocímetro 
+        def construir_fig_meta():
+            fig_meta = go.Figure(go.Indicator(
+                mode = "gauge+number+delta",
+                value = faturamento_atual,
+                domain = {'x': [0, 1], 'y': [0, 1]},
+                title = {'text': "Faturamento Atual (R$)"},
+                delta = {'reference': META_SEMANAL, 'relative': False, 'valueformat': '.2f'},
+                gauge = {
+                    'axis': {'range': [None, META_SEMANAL * 1.2]}, # Eixo vai até 120% da meta
+                    'bar': {'color': "#27AE60"}, # Cor da barra de progresso (Verde)
+                    'bgcolor': "white",
+                    'borderwidth': 2,
+                    'bordercolor': "gray",
+                    'steps': [
+                        {'range': [0, META_SEMANAL * 0.5], 'color': "#FCBCBC"}, # Vermelho claro (Zona de Perigo)
+                        {'range': [META_SEMANAL * 0.5, META_SEMANAL * 0.8], 'color': "#FBEEBB"} # Amarelo (Atenção)
+                    ],
+                    'threshold': {
+                        'line': {'color': "green", 'width': 4},
+                        'thickness': 0.75,
+                        'value': META_SEMANAL # A linha de chegada
+                    }
+                }
+            ))
+
+            fig_meta.update_layout(height=300, margin=dict(l=20, r=20, t=50, b=20))
+            return fig_meta
+
+        fig_meta = get_cache_meta().obter(versao_ao_vivo, 'meta', (estado['eventos'], META_SEMANAL), construir_fig_meta)
     
-    # Encontrando o início dessa semana (Segunda-feira correspondente)
-    inicio_semana = ultima_data_arquivo - pd.Timedelta(days=ultima_data_arquivo.dayofweek)
+        st.plotly_chart(fig_meta, use_container_width=True)
     
-    # Filtrando apenas as vendas dessa semana específica
-    vendas_semana_atual = df[
-        (df['Data'] >= inicio_semana) & 
-        (df['Data'] <= ultima_data_arquivo)
+        # Mensagem motivacional simples
+        falta = META_SEMANAL - faturamento_atual
+        if falta > 0:
+            st.warning(f"🏃‍♂️ Só falta **R$ {falta:.2f}** para bater a meta!\n\n 🚀Simbora!!")
+        else:
+            st.success("🏆 **META BATIDA! PARABÉNS!** 🎉")
+
+    with st.sidebar:
+        widget_meta()
+
+    # --- ALERTA DE ANOMALIAS (Dias fora do padrão) ---
+    detector = get_detector(snapshot.versao)
+    serie_completa = get_serie_diaria(snapshot.versao, df)
+    with detector.lock:
+        # Dias fechados alimentam o detector; o último dia (pode estar em aberto) só é avaliado
+        detector.alimentar(serie_completa.iloc[:-1])
+        anomalias = detector.tabela_anomalias()
+        ultimo_dia, valor_ultimo_dia = serie_completa.index[-1], serie_completa.iloc[-1]
+        z_ultimo_dia = detector.avaliar(ultimo_dia, valor_ultimo_dia)
+        if z_ultimo_dia is not None and abs(z_ultimo_dia) > detector.limiar:
+            anomalias = pd.concat([anomalias, pd.DataFrame([{
+                'Data': ultimo_dia,
+                'Faturamento': valor_ultimo_dia,
+                'Esperado': detector.media[ultimo_dia.dayofweek],
+                'Z': z_ultimo_dia,
+                'Tipo': 'Pico' if z_ultimo_dia > 0 else 'Queda',
+            }])], ignore_index=True)
+
+    # Só interessa o que está dentro do período filtrado
+    anomalias = anomalias[
+        (anomalias['Data'].dt.date >= data_inicial) &
+        (anomalias['Data'].dt.date <= data_final)
     ]
-    
-    faturamento_atual = vendas_semana_atual['Faturamento'].sum()
-    
-    # Criando o Gráfico de Velocímetro 
-    fig_meta = go.Figure(go.Indicator(
-        mode = "gauge+number+delta",
-        value = faturamento_atual,
-        domain = {'x': [0, 1], 'y': [0, 1]},
-        title = {'text': "Faturamento Atual (R$)"},
-        delta = {'reference': META_SEMANAL, 'relative': False, 'valueformat': '.2f'},
-        gauge = {
-            'axis': {'range': [None, META_SEMANAL * 1.2]}, # Eixo vai até 120% da meta
-            'bar': {'color': "#27AE60"}, # Cor da barra de progresso (Verde)
-            'bgcolor': "white",
-            'borderwidth': 2,
-            'bordercolor': "gray",
-            'steps': [
-                {'range': [0, META_SEMANAL * 0.5], 'color': "#FCBCBC"}, # Vermelho claro (Zona de Perigo)
-                {'range': [META_SEMANAL * 0.5, META_SEMANAL * 0.8], 'color': "#FBEEBB"} # Amarelo (Atenção)
-            ],
-            'threshold': {
-                'line': {'color': "green", 'width': 4},
-                'thickness': 0.75,
-                'value': META_SEMANAL # A linha de chegada
-            }
-        }
-    ))
 
-    fig_meta.update_layout(height=300, margin=dict(l=20, r=20, t=50, b=20))
-    st.sidebar.plotly_chart(fig_meta, use_container_width=True)
-    
-    # Mensagem motivacional simples
-    falta = META_SEMANAL - faturamento_atual
-    if falta > 0:
-        st.sidebar.warning(f"🏃‍♂️ Só falta **R$ {falta:.2f}** para bater a meta!\n\n 🚀Simbora!!")
-    else:
-        st.sidebar.success("🏆 **META BATIDA! PARABÉNS!** 🎉")
+    if not anomalias.empty:
+        st.sidebar.markdown("---")
+        st.sidebar.header("🚨 Dias Fora do Padrão")
+        for _, linha in anomalias.sort_values('Data', ascending=False).iterrows():
+            icone = "📈" if linha['Tipo'] == 'Pico' else "📉"
+            st.sidebar.error(
+                f"{icone} **{linha['Data']:%d/%m/%Y}** ({linha['Tipo']}): "
+                f"R$ {linha['Faturamento']:.2f} - esperado ~R$ {linha['Esperado']:.2f}"
+            )
 
     # --- GRÁFICOS DE TENDÊNCIA DIÁRIA E SEMANAL ---
     # 2 colunas para gráficos de tempo
@@ -151,48 +213,64 @@ if not df.empty:
     with g_col1:
         st.subheader("📈 Faturamento Diário")
         
-        # Agrupando
-        vendas_diarias = df_filtrado.groupby('Data')['Faturamento'].sum().reset_index()
+        def construir_fig_diario():
+            # Agrupando
+            vendas_diarias = rollup_diario(df_filtrado)
         
-        # Rótulos (Apenas Iniciais: S, T, Q...)
-        mapa_letras = {0: 'S', 1: 'T', 2: 'Q', 3: 'Q', 4: 'S', 5: 'S', 6: 'D'}
-        rotulos_eixo = [mapa_letras[d.dayofweek] for d in vendas_diarias['Data']]
+            # Rótulos (Apenas Iniciais: S, T, Q...)
+            mapa_letras = {0: 'S', 1: 'T', 2: 'Q', 3: 'Q', 4: 'S', 5: 'S', 6: 'D'}
+            rotulos_eixo = [mapa_letras[d.dayofweek] for d in vendas_diarias['Data']]
         
-        # Gráfico Base
-        fig_diario = px.line(
-            vendas_diarias, 
-            x='Data', 
-            y='Faturamento', 
-            markers=True,
-            template="plotly_white", 
-            line_shape='spline'
-        )
+            # Gráfico Base
+            fig_diario = px.line(
+                vendas_diarias, 
+                x='Data', 
+                y='Faturamento', 
+                markers=True,
+                template="plotly_white", 
+                line_shape='spline'
+            )
         
-        # Configurando o Eixo X (Com a Linha Vertical Interativa)
-        fig_diario.update_xaxes(
-            tickmode='array',
-            tickvals=vendas_diarias['Data'],
-            ticktext=rotulos_eixo,
-            title=None,
-            showgrid=False,        # Garante que não tenha grade vertical também
+            # Configurando o Eixo X (Com a Linha Vertical Interativa)
+            fig_diario.update_xaxes(
+                tickmode='array',
+                tickvals=vendas_diarias['Data'],
+                ticktext=rotulos_eixo,
+                title=None,
+                showgrid=False,        # Garante que não tenha grade vertical também
             
-            # Spike Line (Linha Guia Vertical)
-            showspikes=True,
-            spikemode='toaxis',
-            spikesnap='cursor',
-            spikedash='dot',
-            spikecolor='#999999',
-            spikethickness=1
-        )
+                # Spike Line (Linha Guia Vertical)
+                showspikes=True,
+                spikemode='toaxis',
+                spikesnap='cursor',
+                spikedash='dot',
+                spikecolor='#999999',
+                spikethickness=1
+            )
         
-        # Configurando o Eixo Y 
-        fig_diario.update_yaxes(title=None, showgrid=False) 
+            # Configurando o Eixo Y 
+            fig_diario.update_yaxes(title=None, showgrid=False) 
 
-        # Interação
-        fig_diario.update_layout(hovermode="x") # Linha vertical segue o mouse
+            # Interação
+            fig_diario.update_layout(hovermode="x") # Linha vertical segue o mouse
         
-        # Tooltip
-        fig_diario.update_traces(hovertemplate='<b>%{x|%d/%m/%Y}</b><br>R$ %{y:,.2f}')
+            # Tooltip
+            fig_diario.update_traces(hovertemplate='<b>%{x|%d/%m/%Y}</b><br>R$ %{y:,.2f}')
+
+            # Marcando os dias anômalos (X vermelho por cima da linha)
+            if not anomalias.empty:
+                fig_diario.add_trace(go.Scatter(
+                    x=anomalias['Data'],
+                    y=anomalias['Faturamento'],
+                    mode='markers',
+                    marker=dict(color='#E74C3C', size=12, symbol='x'),
+                    name='Anomalia',
+                    customdata=anomalias[['Esperado', 'Tipo']],
+                    hovertemplate='<b>⚠️ %{customdata[1]}</b><br>R$ %{y:,.2f}<br>Esperado: R$ %{customdata[0]:,.2f}<extra></extra>'
+                ))
+            return fig_diario
+
+        fig_diario = cache_figuras.obter(snapshot.versao, 'diario', (data_inicial, data_final), construir_fig_diario)
         
         st.plotly_chart(fig_diario, use_container_width=True)
 
@@ -200,25 +278,29 @@ if not df.empty:
         st.subheader("📅 Faturamento Semanal")
         
         # Agrupando os dados por semana 
-        vendas_semanais = df_filtrado.set_index('Data').resample('W-SUN')['Faturamento'].sum().reset_index()
+        vendas_semanais = rollup_semanal(df_filtrado)
         
-        # Gráfico Limpo
-        fig_semanal = px.bar(
-            vendas_semanais, 
-            x='Data', 
-            y='Faturamento', 
-            # Sem text_auto, para não poluir
-            template="plotly_white", 
-            color_discrete_sequence=['#2E86C1']
-        )
+        def construir_fig_semanal():
+            # Gráfico Limpo
+            fig_semanal = px.bar(
+                vendas_semanais, 
+                x='Data', 
+                y='Faturamento', 
+                # Sem text_auto, para não poluir
+                template="plotly_white", 
+                color_discrete_sequence=['#2E86C1']
+            )
         
-        # Configurando o Tooltip (Hover)
-        fig_semanal.update_traces(
-            hovertemplate='<b>Semana até %{x|%d/%m/%Y}</b><br>💰 Total: R$ %{y:,.2f}<extra></extra>'
-        )
+            # Configurando o Tooltip (Hover)
+            fig_semanal.update_traces(
+                hovertemplate='<b>Semana até %{x|%d/%m/%Y}</b><br>💰 Total: R$ %{y:,.2f}<extra></extra>'
+            )
         
-        # Limpando os Eixos
-        fig_semanal.update_layout(xaxis_title=None, yaxis_title=None)
+            # Limpando os Eixos
+            fig_semanal.update_layout(xaxis_title=None, yaxis_title=None)
+            return fig_semanal
+
+        fig_semanal = cache_figuras.obter(snapshot.versao, 'semanal', (data_inicial, data_final), construir_fig_semanal)
         
         st.plotly_chart(fig_semanal, use_container_width=True)
 
@@ -226,35 +308,33 @@ if not df.empty:
     st.markdown("---") 
     st.subheader("🗓️ Faturamento Mensal")
 
-    # Agregando os dados 
-    vendas_mensais = df_filtrado.set_index('Data').resample('MS')['Faturamento'].agg(['sum', 'count']).reset_index()
-    
-    # Renomeando as colunas para facilitar (sum -> Faturamento, count -> Quantidade)
-    vendas_mensais.columns = ['Data', 'Faturamento', 'Quantidade']
-    
-    # Criando a string de Data (Jan/2025)
-    vendas_mensais['Mes_Ano'] = vendas_mensais['Data'].dt.strftime('%b/%Y')
-
-    # Criando o gráfico
-    fig_mensal = px.bar(
-        vendas_mensais, 
-        x='Mes_Ano', 
-        y='Faturamento',
-        template="plotly_white",
-        title="Evolução do Faturamento e Volume de Serviços",
-        hover_data=['Quantidade'] 
-    )
+    # Agregando os dados (Faturamento, Quantidade e Mes_Ano - ex: Jan/2025)
+    vendas_mensais = rollup_mensal(df_filtrado)
+
+    def construir_fig_mensal():
+        # Criando o gráfico
+        fig_mensal = px.bar(
+            vendas_mensais, 
+            x='Mes_Ano', 
+            y='Faturamento',
+            template="plotly_white",
+            title="Evolução do Faturamento e Volume de Serviços",
+            hover_data=['Quantidade'] 
+        )
     
-    # Personalizando o tooltip (hover)
-    fig_mensal.update_traces(
-        marker_color='#1F618D', 
-        showlegend=False,
-        # HTML Básico para formatar o texto flutuante
-        # %{x} = Mês | %{y} = Valor | %{customdata[0]} = Quantidade
-        hovertemplate='<br><b>%{x}</b><br>💰 R$ %{y:,.2f}<br>🚗 %{customdata[0]} Lavagens<extra></extra>'
-    )
+        # Personalizando o tooltip (hover)
+        fig_mensal.update_traces(
+            marker_color='#1F618D', 
+            showlegend=False,
+            # HTML Básico para formatar o texto flutuante
+            # %{x} = Mês | %{y} = Valor | %{customdata[0]} = Quantidade
+            hovertemplate='<br><b>%{x}</b><br>💰 R$ %{y:,.2f}<br>🚗 %{customdata[0]} Lavagens<extra></extra>'
+        )
     
-    fig_mensal.update_layout(xaxis_title=None, yaxis_title="Total (R$)")
+        fig_mensal.update_layout(xaxis_title=None, yaxis_title="Total (R$)")
+        return fig_mensal
+
+    fig_mensal = cache_figuras.obter(snapshot.versao, 'mensal', (data_inicial, data_final), construir_fig_mensal)
     
     st.plotly_chart(fig_mensal, use_container_width=True)
    
@@ -264,153 +344,197 @@ if not df.empty:
     st.subheader("📊 Médias: Dinheiro vs. Quantidade")
 
     col_raio_x1, col_raio_x2 = st.columns(2)
-    ordem_dias = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
+    ordem_dias = ORDEM_DIAS
 
-    # Média de faturamento por dia da semana
-    media_dia_semana = df_filtrado.groupby('Dia_Semana_PT')['Faturamento'].mean().reindex(ordem_dias).reset_index()
-    
     # --- GRÁFICO FATURAMENTO MÉDIO ---
     with col_raio_x1:      
-        fig_fat_medio = px.bar(
-            media_dia_semana, 
-            x='Dia_Semana_PT', 
-            y='Faturamento',
-            title="Média de Faturamento (R$)",
-            # REMOVIDO: text_auto='.2f' (Isso limpa os números fixos)
-            template="plotly_white",
-            color_discrete_sequence=['#2E86C1'] # Azul
-        )
+        def construir_fig_fat_medio():
+            # Média de faturamento por dia da semana
+            media_dia_semana = df_filtrado.groupby('Dia_Semana_PT')['Faturamento'].mean().reindex(ordem_dias).reset_index()
+
+            fig_fat_medio = px.bar(
+                media_dia_semana, 
+                x='Dia_Semana_PT', 
+                y='Faturamento',
+                title="Média de Faturamento (R$)",
+                # REMOVIDO: text_auto='.2f' (Isso limpa os números fixos)
+                template="plotly_white",
+                color_discrete_sequence=['#2E86C1'] # Azul
+            )
         
-        # Configuração do Tooltip (Mouse por cima)
-        fig_fat_medio.update_traces(
-            hovertemplate='<b>%{x}</b><br>💰 Média: R$ %{y:,.2f}<extra></extra>'
-        )
+            # Configuração do Tooltip (Mouse por cima)
+            fig_fat_medio.update_traces(
+                hovertemplate='<b>%{x}</b><br>💰 Média: R$ %{y:,.2f}<extra></extra>'
+            )
+        
+            fig_fat_medio.update_layout(xaxis_title=None, yaxis_title="R$")
+            return fig_fat_medio
+
+        fig_fat_medio = cache_figuras.obter(snapshot.versao, 'fat_medio', (data_inicial, data_final), construir_fig_fat_medio)
         
-        fig_fat_medio.update_layout(xaxis_title=None, yaxis_title="R$")
         st.plotly_chart(fig_fat_medio, use_container_width=True)
 
     # --- GRÁFICO VOLUME MÉDIO ---
     with col_raio_x2:
-        # Lógica de cálculo (mantida)
-        volume_diario = df_filtrado.groupby(['Data', 'Dia_Semana_PT']).size().reset_index(name='Qtd_Servicos')
-        media_volume_semana = volume_diario.groupby('Dia_Semana_PT')['Qtd_Servicos'].mean().reindex(ordem_dias).reset_index()
+        def construir_fig_vol():
+            # Lógica de cálculo (mantida)
+            volume_diario = df_filtrado.groupby(['Data', 'Dia_Semana_PT']).size().reset_index(name='Qtd_Servicos')
+            media_volume_semana = volume_diario.groupby('Dia_Semana_PT')['Qtd_Servicos'].mean().reindex(ordem_dias).reset_index()
         
-        fig_vol = px.bar(
-            media_volume_semana, 
-            x='Dia_Semana_PT', 
-            y='Qtd_Servicos',
-            title="Média de Veículos Atendidos (Qtd)",
-            # REMOVIDO: text_auto='.2f'
-            template="plotly_white",
-            color_discrete_sequence=['#E67E22'] # Laranja
-        )
+            fig_vol = px.bar(
+                media_volume_semana, 
+                x='Dia_Semana_PT', 
+                y='Qtd_Servicos',
+                title="Média de Veículos Atendidos (Qtd)",
+                # REMOVIDO: text_auto='.2f'
+                template="plotly_white",
+                color_discrete_sequence=['#E67E22'] # Laranja
+            )
         
-        # Configuração do Tooltip (Mouse por cima)
-        # %{y:.1f} mostra com 1 casa decimal (ex: 8.5 carros)
-        fig_vol.update_traces(
-            hovertemplate='<b>%{x}</b><br>🚗 Média: %{y:.1f} Veículos<extra></extra>'
-        )
+            # Configuração do Tooltip (Mouse por cima)
+            # %{y:.1f} mostra com 1 casa decimal (ex: 8.5 carros)
+            fig_vol.update_traces(
+                hovertemplate='<b>%{x}</b><br>🚗 Média: %{y:.1f} Veículos<extra></extra>'
+            )
+        
+            fig_vol.update_layout(xaxis_title=None, yaxis_title="Veículos")
+            return fig_vol
+
+        fig_vol = cache_figuras.obter(snapshot.versao, 'vol', (data_inicial, data_final), construir_fig_vol)
         
-        fig_vol.update_layout(xaxis_title=None, yaxis_title="Veículos")
         st.plotly_chart(fig_vol, use_container_width=True)
 
+    # --- CLIENTES (Frequência, RFM e Risco de Churn) ---
+    st.markdown("---")
+    st.subheader("👥 Clientes")
+    st.caption("Considera todo o histórico (não depende do filtro de datas).")
+
+    indice_clientes.sincronizar(snapshot)
+    tabela_clientes = indice_clientes.tabela()
+    hoje = ao_vivo.ultima_data # Data de referência: último serviço registrado
+
+    if tabela_clientes.empty:
+        st.info("Nenhum cliente identificado ainda.")
+    else:
+        atrasados = indice_clientes.clientes_atrasados(hoje)
+        recorrentes = (tabela_clientes['visitas'] > 1).mean()
+
+        cli_col1, cli_col2, cli_col3, cli_col4 = st.columns(4)
+        cli_col1.metric("Clientes", len(tabela_clientes))
+        cli_col2.metric("Recorrentes", f"{recorrentes:.0%}")
+        cli_col3.metric("Gasto Médio por Cliente", f"R$ {tabela_clientes['total_gasto'].mean():,.2f}")
+        cli_col4.metric("Atrasados para Lavar", len(atrasados))
+
+        col_top, col_rfm = st.columns(2)
+
+        with col_top:
+            st.markdown("**🏆 Top 10 Clientes**")
+            top = indice_clientes.top_clientes(10)[['visitas', 'total_gasto', 'ultima_visita']]
+            top.columns = ['Visitas', 'Total (R$)', 'Última Visita']
+            st.dataframe(top.style.format({'Total (R$)': "R$ {:.2f}", 'Última Visita': "{:%d/%m/%Y}"}))
+
+        with col_rfm:
+            def construir_fig_rfm():
+                segmentos = indice_clientes.segmentos_rfm(hoje)['Segmento'].value_counts().reset_index()
+                segmentos.columns = ['Segmento', 'Clientes']
+
+                fig_rfm = px.bar(
+                    segmentos,
+                    x='Segmento',
+                    y='Clientes',
+                    title="Segmentos RFM (Recência, Frequência, Valor)",
+                    template="plotly_white",
+                    color_discrete_sequence=['#8E44AD'] # Roxo
+                )
+                fig_rfm.update_traces(hovertemplate='<b>%{x}</b><br>👥 %{y} Clientes<extra></extra>')
+                fig_rfm.update_layout(xaxis_title=None, yaxis_title="Clientes")
+                return fig_rfm
+
+            fig_rfm = cache_figuras.obter(snapshot.versao, 'rfm', (hoje, indice_clientes.alteracoes), construir_fig_rfm)
+            st.plotly_chart(fig_rfm, use_container_width=True)
+
+        with st.expander(f"🧽 Clientes Atrasados para Lavar ({len(atrasados)})"):
+            tabela_atrasados = atrasados[['ultima_visita', 'dias_sem_vir', 'intervalo_medio', 'visitas', 'total_gasto']].copy()
+            tabela_atrasados.columns = ['Última Visita', 'Dias sem Vir', 'Costuma Vir a Cada (dias)', 'Visitas', 'Total (R$)']
+            st.dataframe(tabela_atrasados.style.format({
+                'Última Visita': "{:%d/%m/%Y}",
+                'Costuma Vir a Cada (dias)': "{:.1f}",
+                'Total (R$)': "R$ {:.2f}",
+            }))
+
     # --- TABELA DE DADOS BRUTOS ---
     with st.expander("Ver Dados Detalhados"):
         st.dataframe(df_filtrado.style.format({"Faturamento": "R$ {:.2f}"}))
 
+        # --- EXPORTAÇÃO (CSV / Parquet) ---
+        # Exporta o DataFrame cru (sem .style), gerado em pedaços
+        tabelas_export = {
+            'Dados Filtrados': df_filtrado,
+            'Resumo Semanal': vendas_semanais,
+            'Resumo Mensal': vendas_mensais,
+        }
+
+        exp_col1, exp_col2, exp_col3 = st.columns(3)
+        tabela_escolhida = exp_col1.selectbox("Tabela", list(tabelas_export.keys()))
+        formato_escolhido = exp_col2.selectbox("Formato", list(FORMATOS.keys()))
+
+        _, extensao, mime = FORMATOS[formato_escolhido]
+        nome_arquivo = f"{tabela_escolhida.lower().replace(' ', '_')}_{data_inicial:%Y%m%d}_{data_final:%Y%m%d}.{extensao}"
+
+        df_export = tabelas_export[tabela_escolhida]
+
+        def gerar_arquivo():
+            # Só roda no clique: os pedaços vão direto para um arquivo temporário (sem juntar tudo na memória).
+            # O Streamlit guarda o download em memória de qualquer jeito, então lemos uma vez e apagamos o temporário.
+            descritor, caminho = tempfile.mkstemp(suffix=f".{extensao}")
+            os.close(descritor)
+            try:
+                salvar_arquivo(df_export, caminho, formato_escolhido)
+                with open(caminho, 'rb') as arquivo:
+                    return arquivo.read()
+            finally:
+                os.remove(caminho)
+
+        exp_col3.download_button("⬇️ Baixar", data=gerar_arquivo, file_name=nome_arquivo, mime=mime, on_click="ignore")
+
     # --- SEÇÃO DE PREVISÃO DE DEMANDA ---
 
     # Criando abas para separar o "Passado" do "Futuro"
     tab_historico, tab_previsao = st.tabs(["📊 Visão Histórica", "🔮 Previsão de Metas (IA)"])
 
     with tab_historico:
-        with g_col1:
-            
-            # Agrupando
-            vendas_diarias = df_filtrado.groupby('Data')['Faturamento'].sum().reset_index()
-            
-            # Rótulos (Apenas Iniciais: S, T, Q...)
-            mapa_letras = {0: 'S', 1: 'T', 2: 'Q', 3: 'Q', 4: 'S', 5: 'S', 6: 'D'}
-            rotulos_eixo = [mapa_letras[d.dayofweek] for d in vendas_diarias['Data']]
-            
-            # Gráfico Base
-            fig_diario = px.line(
-                vendas_diarias, 
-                x='Data', 
-                y='Faturamento', 
-                markers=True,
-                template="plotly_white", 
-                line_shape='spline'
-            )
-            
-            # Configurando o Eixo X (Com a Linha Vertical Interativa)
-            fig_diario.update_xaxes(
-                tickmode='array',
-                tickvals=vendas_diarias['Data'],
-                ticktext=rotulos_eixo,
-                title=None,
-                showgrid=False,        # Garante que não tenha grade vertical também
-                
-                # Spike Line (Linha Guia Vertical)
-                showspikes=True,
-                spikemode='toaxis',
-                spikesnap='cursor',
-                spikedash='dot',
-                spikecolor='#999999',
-                spikethickness=1
-            )
-            
-            # Configurando o Eixo Y 
-            fig_diario.update_yaxes(title=None, showgrid=False) 
-
-            # Interação
-            fig_diario.update_layout(hovermode="x") # Linha vertical segue o mouse
-            
-            # Tooltip
-            fig_diario.update_traces(hovertemplate='<b>%{x|%d/%m/%Y}</b><br>R$ %{y:,.2f}')
-            
         st.info("👆 Aqui estão os dados que analisamos anteriormente.")
 
     with tab_previsao:
         st.header("🤖 Inteligência Artificial: Previsão para Próxima Semana")
         
-        # Executar a previsão apenas se houver dados suficientes
-        if len(df) > 14: # Precisa de pelo menos 2 semanas pra brincar
-            
-            # 1. Preparar dados para o Modelo (Regressão - O mais robusto para produção)
-            # Vamos usar a Regressão Linear pois ela é mais rápida e estável para o App
-            from sklearn.linear_model import LinearRegression
-            
-            # Agrupamento diário
-            df_prev = df.groupby('Data')['Faturamento'].sum().asfreq('D').fillna(0).reset_index()
-            df_prev['Dia_Semana'] = df_prev['Data'].dt.dayofweek
-            df_prev['Tempo'] = np.arange(len(df_prev))
-            
-            # Treino (Usa tudo até hoje)
-            X = pd.get_dummies(df_prev['Dia_Semana'], prefix='D', drop_first=True)
-            X['Tempo'] = df_prev['Tempo']
-            y = df_prev['Faturamento']
-            
-            modelo = LinearRegression()
-            modelo.fit(X, y)
-            
-            # 2. Criar Datas Futuras (Próximos 7 dias)
-            ultima_data = df_prev['Data'].max()
-            datas_futuras = pd.date_range(start=ultima_data + pd.Timedelta(days=1), periods=7)
-            
-            df_futuro = pd.DataFrame({'Data': datas_futuras})
-            df_futuro['Dia_Semana'] = df_futuro['Data'].dt.dayofweek
-            df_futuro['Tempo'] = np.arange(len(df_prev), len(df_prev) + 7)
-            
-            # Preparar X do futuro (garantindo as mesmas colunas)
-            X_futuro = pd.get_dummies(df_futuro['Dia_Semana'], prefix='D', drop_first=True)
-            X_futuro['Tempo'] = df_futuro['Tempo']
-            # Alinha as colunas (se faltar alguma dummy no futuro, preenche com 0)
-            X_futuro = X_futuro.reindex(columns=X.columns, fill_value=0)
-            
-            # Prevendo o Futuro
-            y_pred = modelo.predict(X_futuro)
-            df_futuro['Previsao'] = np.maximum(y_pred, 0) # Garante que não seja negativo
+        # Executar a previsão apenas se houver dados suficientes (2 semanas)
+        # Regressão Linear Sazonal - a mais rápida e estável para o App (metrics.py)
+        # Se o job em segundo plano (forecastJob.py) já gravou uma previsão, usamos ela (zero espera).
+        # Senão, cai na regressão calculada na hora.
+        ultima_previsao = ler_ultima_previsao()
+        if ultima_previsao is not None and not previsao_atualizada(ultima_previsao[0], snapshot):
+            # Job parado ou atrasado: previsão treinada com outra versão do CSV (dias novos ou corrigidos) não serve
+            st.warning(
+                f"⚠️ A previsão do job em segundo plano foi treinada com uma versão anterior dos dados (dados até "
+                f"{pd.Timestamp(ultima_previsao[0]['dados_ate']):%d/%m/%Y}). Usando a regressão calculada agora."
+            )
+            ultima_previsao = None
+
+        if ultima_previsao is not None:
+            artefato, df_futuro = ultima_previsao
+            previsao = (get_serie_diaria(snapshot.versao, df).reset_index(), df_futuro)
+            id_previsao = artefato['id']
+            st.caption(
+                f"🧠 Modelo **{artefato['modelo']}** - gerado em {pd.Timestamp(artefato['gerado_em']):%d/%m/%Y %H:%M} "
+                f"com dados até {pd.Timestamp(artefato['dados_ate']):%d/%m/%Y}"
+            )
+        else:
+            previsao = prever_proximos_dias(df, dias=7)
+            id_previsao = None
+
+        if previsao is not None:
+            df_prev, df_futuro = previsao
             
             # Exibindo Métricas e Gráfico
             total_previsto = df_futuro['Previsao'].sum()
@@ -418,7 +542,7 @@ if not df.empty:
             
             col_meta.metric(
                 "💰 Meta de Faturamento (Próx. 7 Dias)", 
-                f"R$ {total_previsto:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+                formatar_reais(total_previsto)
             )
             
             # Pega a previsão do próximo Sábado (Dia 5 da semana)
@@ -427,49 +551,50 @@ if not df.empty:
             
             col_sabado.metric(
                 "🚗 Previsão para o Próximo Sábado", 
-                f"R$ {valor_sabado:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+                formatar_reais(valor_sabado)
             )
             
-            # Gráfico de Linha (Conectando Passado e Futuro)
-            # Pegamos os últimos 14 dias reais + 7 dias futuros
-            df_historico_recente = df_prev.tail(14).copy()
-            df_historico_recente['Tipo'] = 'Realizado'
-            df_historico_recente.rename(columns={'Faturamento': 'Valor'}, inplace=True)
+            def construir_fig_prev():
+                # Gráfico de Linha (Conectando Passado e Futuro)
+                # Pegamos os últimos 14 dias reais + 7 dias futuros
+                df_historico_recente = df_prev.tail(14).copy()
+                df_historico_recente['Tipo'] = 'Realizado'
+                df_historico_recente.rename(columns={'Faturamento': 'Valor'}, inplace=True)
             
-            df_futuro_plot = df_futuro[['Data', 'Previsao']].copy()
-            df_futuro_plot['Tipo'] = 'Previsão IA'
-            df_futuro_plot.rename(columns={'Previsao': 'Valor'}, inplace=True)
+                df_futuro_plot = df_futuro[['Data', 'Previsao']].copy()
+                df_futuro_plot['Tipo'] = 'Previsão IA'
+                df_futuro_plot.rename(columns={'Previsao': 'Valor'}, inplace=True)
             
-            df_final_plot = pd.concat([df_historico_recente[['Data', 'Valor', 'Tipo']], df_futuro_plot])
+                df_final_plot = pd.concat([df_historico_recente[['Data', 'Valor', 'Tipo']], df_futuro_plot])
             
-            # Gráfico de Linha (Conectando Passado e Futuro)            
-            fig_prev = px.line(
-                df_final_plot, 
-                x='Data', 
-                y='Valor', 
-                color='Tipo',
-                markers=True,
-                title="Tendência Recente vs. Previsão",
-                color_discrete_map={
-                    'Realizado': '#FFFFFF',  # Branco Puro (para destacar no fundo escuro)
-                    'Previsão IA': '#00BFFF' # Azul Cyan Neon (para destacar a previsão)
-                }
-            )
+                # Gráfico de Linha (Conectando Passado e Futuro)            
+                fig_prev = px.line(
+                    df_final_plot, 
+                    x='Data', 
+                    y='Valor', 
+                    color='Tipo',
+                    markers=True,
+                    title="Tendência Recente vs. Previsão",
+                    color_discrete_map={
+                        'Realizado': '#FFFFFF',  # Branco Puro (para destacar no fundo escuro)
+                        'Previsão IA': '#00BFFF' # Azul Cyan Neon (para destacar a previsão)
+                    }
+                )
             
-            # Estilo tracejado para o futuro
-            fig_prev.update_traces(patch={"line": {"dash": "dot"}}, selector={"legendgroup": "Previsão IA"})
+                # Estilo tracejado para o futuro
+                fig_prev.update_traces(patch={"line": {"dash": "dot"}}, selector={"legendgroup": "Previsão IA"})
             
-            # Isso garante que ele respeite o modo escuro do Streamlit
-            fig_prev.update_layout(
-                paper_bgcolor='rgba(0,0,0,0)', 
-                plot_bgcolor='rgba(0,0,0,0)',
-                font=dict(color="white") # Garante que os textos dos eixos fiquem brancos também
-            )
+                # Isso garante que ele respeite o modo escuro do Streamlit
+                fig_prev.update_layout(
+                    paper_bgcolor='rgba(0,0,0,0)', 
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    font=dict(color="white") # Garante que os textos dos eixos fiquem brancos também
+                )
+                return fig_prev
+
+            fig_prev = cache_figuras.obter(snapshot.versao, 'prev', id_previsao, construir_fig_prev)
             
             st.plotly_chart(fig_prev, use_container_width=True)
-            
-            # Estilo tracejado para o futuro
-            fig_prev.update_traces(patch={"line": {"dash": "dot"}}, selector={"legendgroup": "Previsão IA"})
                         
             with st.expander("Ver Tabela de Metas Diárias"):
                 tabela_show = df_futuro[['Data', 'Previsao']].copy()
@@ -480,5 +605,12 @@ if not df.empty:
         else:
             st.warning("⚠️ Precisamos de mais dados! Continue cadastrando o faturamento diário para liberar a IA.")
 
+    # --- RODAPÉ: métricas do cache de gráficos ---
+    m = cache_figuras.metricas()
+    st.caption(
+        f"⚡ Cache de gráficos: {m['acertos']} acertos, {m['falhas']} falhas "
+        f"({m['taxa_acerto']:.0%}), {m['tamanho']} figuras guardadas, {m['despejos']} despejadas - dados v{snapshot.versao}"
+    )
+
 else:
     st.warning("Aguardando carregamento dos dados...")
\ No newline at end of file
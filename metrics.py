@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+# --- CÁLCULOS DO DASHBOARD ---
+# Funções puras (sem Streamlit) para o dashboard e a API usarem os MESMOS números.
+
+# Definindo a Meta (R$)
+META_SEMANAL = 2000.00
+
+ORDEM_DIAS = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
+
+
+def filtrar_periodo(df, data_inicial, data_final):
+    # Aplicando o filtro de data (datas do tipo date, inclusivas)
+    return df[(df['Data'].dt.date >= data_inicial) & (df['Data'].dt.date <= data_final)]
+
+
+def calcular_kpis(df_filtrado):
+    # Cálculos dos indicadores
+    faturamento_total = df_filtrado['Faturamento'].sum()
+    qtd_servicos = len(df_filtrado)
+    ticket_medio = faturamento_total / qtd_servicos if qtd_servicos > 0 else 0
+
+    # Identificando o melhor dia da semana
+    faturamento_por_dia = df_filtrado.groupby('Dia_Semana_PT')['Faturamento'].sum()
+    melhor_dia = faturamento_por_dia.idxmax() if not faturamento_por_dia.empty else "N/A"
+
+    return {
+        'faturamento_total': float(faturamento_total),
+        'qtd_servicos': qtd_servicos,
+        'ticket_medio': float(ticket_medio),
+        'melhor_dia': melhor_dia,
+    }
+
+
+def faturamento_semana_atual(df):
+    # Semana atual = da Segunda-feira até a última data do arquivo
+    ultima_data_arquivo = df['Data'].max()
+    inicio_semana = ultima_data_arquivo - pd.Timedelta(days=ultima_data_arquivo.dayofweek)
+
+    # Filtrando apenas as vendas dessa semana específica
+    vendas_semana_atual = df[
+        (df['Data'] >= inicio_semana) &
+        (df['Data'] <= ultima_data_arquivo)
+    ]
+    return inicio_semana, ultima_data_arquivo, float(vendas_semana_atual['Faturamento'].sum())
+
+
+# --- AGRUPAMENTOS (Diário, Semanal, Mensal) ---
+def rollup_diario(df_filtrado):
+    return df_filtrado.groupby('Data')['Faturamento'].sum().reset_index()
+
+
+def rollup_semanal(df_filtrado):
+    # Semanas fechando no Domingo
+    return df_filtrado.set_index('Data').resample('W-SUN')['Faturamento'].sum().reset_index()
+
+
+def rollup_mensal(df_filtrado):
+    vendas_mensais = df_filtrado.set_index('Data').resample('MS')['Faturamento'].agg(['sum', 'count']).reset_index()
+
+    # Renomeando as colunas para facilitar (sum -> Faturamento, count -> Quantidade)
+    vendas_mensais.columns = ['Data', 'Faturamento', 'Quantidade']
+
+    # Criando a string de Data (Jan/2025)
+    vendas_mensais['Mes_Ano'] = vendas_mensais['Data'].dt.strftime('%b/%Y')
+    return vendas_mensais
+
+
+ROLLUPS = {
+    'diario': rollup_diario,
+    'semanal': rollup_semanal,
+    'mensal': rollup_mensal,
+}
+
+
+# --- PREVISÃO (Regressão Linear Sazonal) ---
+def prever_proximos_dias(df, dias=7):
+    # Devolve (df_prev, df_futuro) ou None se não tiver dados suficientes
+    if len(df) <= 14: # Precisa de pelo menos 2 semanas pra brincar
+        return None
+
+    from sklearn.linear_model import LinearRegression
+
+    # Agrupamento diário
+    df_prev = df.groupby('Data')['Faturamento'].sum().asfreq('D').fillna(0).reset_index()
+    df_prev['Dia_Semana'] = df_prev['Data'].dt.dayofweek
+    df_prev['Tempo'] = np.arange(len(df_prev))
+
+    # Treino (Usa tudo até hoje)
+    X = pd.get_dummies(df_prev['Dia_Semana'], prefix='D', drop_first=True)
+    X['Tempo'] = df_prev['Tempo']
+    y = df_prev['Faturamento']
+
+    modelo = LinearRegression()
+    modelo.fit(X, y)
+
+    # Criar Datas Futuras
+    ultima_data = df_prev['Data'].max()
+    datas_futuras = pd.date_range(start=ultima_data + pd.Timedelta(days=1), periods=dias)
+
+    df_futuro = pd.DataFrame({'Data': datas_futuras})
+    df_futuro['Dia_Semana'] = df_futuro['Data'].dt.dayofweek
+    df_futuro['Tempo'] = np.arange(len(df_prev), len(df_prev) + dias)
+
+    # Preparar X do futuro (garantindo as mesmas colunas)
+    X_futuro = pd.get_dummies(df_futuro['Dia_Semana'], prefix='D', drop_first=True)
+    X_futuro['Tempo'] = df_futuro['Tempo']
+    # Alinha as colunas (se faltar alguma dummy no futuro, preenche com 0)
+    X_futuro = X_futuro.reindex(columns=X.columns, fill_value=0)
+
+    # Prevendo o Futuro
+    y_pred = modelo.predict(X_futuro)
+    df_futuro['Previsao'] = np.maximum(y_pred, 0) # Garante que não seja negativo
+
+    return df_prev, df_futuro
+
+
+def formatar_reais(valor):
+    # R$ no formato brasileiro: 1.234,56
+    return f"R$ {valor:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
@@ -0,0 +1,99 @@
+import os
+import threading
+from collections import namedtuple
+import pandas as pd
+
+# Copy-on-Write: fatias e filtros viram "visões" baratas do DataFrame compartilhado.
+# Se alguma sessão tentar alterar, ela ganha a própria cópia e o original fica intacto.
+# No pandas 3 isso já é o padrão (a opção só gera aviso); no 2.x precisa ligar na mão.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# Foto (imutável) dos dados: versão + DataFrame + assinatura (mtime, tamanho) do arquivo de onde veio
+Snapshot = namedtuple('Snapshot', ['versao', 'df', 'assinatura'], defaults=[None])
+
+
+# --- ETL (Extrair, transformar e carregar) ---
+def carregar_csv(file):
+    # Carregando os dados
+    df = pd.read_csv(file)
+
+    # Limpando os dados
+    df = df.dropna(subset=['Data', 'Valor (R$)']) # Remove linhas vazias
+
+    # Convertendo a coluna 'Data' para o formato datetime
+    df['Data'] = pd.to_datetime(df['Data'], format='%d/%m/%Y', dayfirst=True, errors='coerce')
+    df = df.dropna(subset=['Data']) # Remove datas inválidas
+
+    # Renomeando colunas para facilitar o uso
+    df = df.rename(columns={'Valor (R$)': 'Faturamento', 'Descrição Original': 'Servico'})
+
+    # Extraindo novas colunas de data para auxiliar nas análises
+    df['Dia_Semana'] = df['Data'].dt.day_name()
+    df['Mes'] = df['Data'].dt.strftime('%Y-%m')
+    df['Semana_Ano'] = df['Data'].dt.isocalendar().week
+
+    # Traduzindo os dias para o gráfico ficar bonito em PT-BR
+    mapa_dias = {
+        'Monday': 'Segunda', 'Tuesday': 'Terça', 'Wednesday': 'Quarta',
+        'Thursday': 'Quinta', 'Friday': 'Sexta', 'Saturday': 'Sábado', 'Sunday': 'Domingo'
+    }
+    df['Dia_Semana_PT'] = df['Dia_Semana'].map(mapa_dias)
+
+    # Ordenando por data
+    return df.sort_values('Data')
+
+
+# --- DATASET ÚNICO PARA TODAS AS SESSÕES ---
+class DatasetCompartilhado:
+    # Guarda UMA cópia dos dados por processo (usar com @st.cache_resource).
+    # Quando o CSV muda, a recarga roda em segundo plano e a troca é atômica:
+    # ninguém espera, quem chegou antes continua com a versão antiga até a nova ficar pronta.
+
+    def __init__(self, file):
+        self.file = file
+        self._snapshot = None
+        self._assinatura = None # (mtime, tamanho) do arquivo carregado
+        self._lock = threading.Lock()
+
+    def _assinatura_arquivo(self):
+        info = os.stat(self.file)
+        return (info.st_mtime_ns, info.st_size)
+
+    def _recarregar(self, assinatura):
+        try:
+            df = carregar_csv(self.file)
+            self.publicar(df, assinatura)
+        except Exception as e:
+            # Arquivo com problema: segue servindo a última versão boa até o próximo salvamento
+            print(f"Erro ao recarregar {self.file}: {e}")
+            self._assinatura = assinatura
+        finally:
+            self._lock.release()
+
+    def publicar(self, df, assinatura=None):
+        # Troca a versão atual por uma nova (atribuição de referência = atômica)
+        versao = self._snapshot.versao + 1 if self._snapshot else 1
+        if assinatura is not None:
+            self._assinatura = assinatura
+        self._snapshot = Snapshot(versao, df, assinatura)
+
+    def obter(self):
+        # Primeira carga: não tem versão antiga para servir, então carrega na hora
+        if self._snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    assinatura = self._assinatura_arquivo()
+                    self.publicar(carregar_csv(self.file), assinatura)
+            return self._snapshot
+
+        # Arquivo mudou? Dispara a recarga em segundo plano (só uma por vez)
+        try:
+            assinatura = self._assinatura_arquivo()
+        except FileNotFoundError:
+            return self._snapshot # Mantém a última versão boa
+
+        if assinatura != self._assinatura and self._lock.acquire(blocking=False):
+            threading.Thread(target=self._recarregar, args=(assinatura,), daemon=True).start()
+
+        return self._snapshot